@@ -0,0 +1,217 @@
+import io
+import os
+import random
+import sys
+import time
+
+import libscrc
+
+from LineTokenizer import LineTokenizer
+from UsefulFunctions import isFloat, returnFloat
+from WUFrameReader import WUFrameReader
+
+
+def makeWUFrame(Kennung: int, counter: int):
+    Kennbin = bytes([Kennung, 0x01])
+    payload = counter.to_bytes(2, "big") + bytes(random.getrandbits(8) for _ in range(2 * Kennung))
+    crc = libscrc.modbus(Kennbin + payload).to_bytes(2, "big")
+    return b'\xaa\x55' + Kennbin + payload + crc
+
+
+def makeWUStream(frameCount: int = 20000, kennungs=(32, 64), corruptEvery: int = 500):
+    stream = bytearray()
+    for counter in range(frameCount):
+        frame = bytearray(makeWUFrame(kennungs[counter % len(kennungs)], counter % 65536))
+        if corruptEvery and counter % corruptEvery == corruptEvery - 1:
+            frame[len(frame) // 2] ^= 0xff
+        stream += frame
+        if corruptEvery and counter % corruptEvery == 0:
+            stream += bytes(random.getrandbits(8) for _ in range(7))
+    return bytes(stream)
+
+
+# Rough cost of a single pyserial read() call (syscall + select) on a real port
+READ_CALL_COST = 20e-6
+
+
+class CountingStream(io.BytesIO):
+    def __init__(self, stream: bytes):
+        super().__init__(stream)
+        self.readCalls = 0
+
+    def read(self, size=-1):
+        self.readCalls += 1
+        return super().read(size)
+
+
+def legacyReadWU(stream: bytes):
+    # Byte-by-byte framing as done by SerialThread.run before WUFrameReader
+    port = CountingStream(stream)
+    frames = 0
+    while True:
+        byte = port.read(1)
+        if byte == b'':
+            break
+        if byte == b'\xaa':
+            if port.read(1) == b'\x55':
+                Kennbin = port.read(2)
+                if len(Kennbin) < 2:
+                    break
+                readLine = port.read(2 * Kennbin[0] + 2 + 2)
+                if len(readLine) < 2:
+                    break
+                libscrc.modbus(Kennbin + readLine[0:-2])
+                frames += 1
+    return frames, port.readCalls
+
+
+def chunkedReadWU(stream: bytes, chunkSize: int):
+    port = CountingStream(stream)
+    reader = WUFrameReader()
+    frames = 0
+    while True:
+        chunk = port.read(chunkSize)
+        if chunk == b'':
+            break
+        frames += len(reader.feed(chunk))
+    return frames, port.readCalls
+
+
+def printWUResult(name, frames, readCalls, duration, megabytes):
+    estimated = duration + readCalls * READ_CALL_COST
+    print("%-18s %7d frames %8d reads %9.0f frames/s %7.2f MB/s | %9.0f frames/s incl. read cost" %
+          (name, frames, readCalls, frames / duration, megabytes / duration, frames / estimated))
+
+
+def benchmarkWUFrameReader(filePath: str = None):
+    if filePath is not None and os.path.exists(filePath):
+        with open(filePath, 'rb') as file:
+            stream = file.read()
+    else:
+        stream = makeWUStream()
+    megabytes = len(stream) / 1e6
+    print("WU stream: %.2f MB" % megabytes)
+
+    print("Read cost assumed per pyserial read() call: %.0f us" % (READ_CALL_COST * 1e6))
+
+    startTime = time.perf_counter()
+    frames, readCalls = legacyReadWU(stream)
+    printWUResult("read(1) framing", frames, readCalls, time.perf_counter() - startTime, megabytes)
+
+    for chunkSize in (64, 512, 4096, 65536):
+        startTime = time.perf_counter()
+        frames, readCalls = chunkedReadWU(stream, chunkSize)
+        printWUResult("chunks of " + str(chunkSize), frames, readCalls, time.perf_counter() - startTime, megabytes)
+
+
+def legacyTokenize(rawData: str):
+    # Name/number extraction as done by Graph.dataFindAutomaitc before LineTokenizer
+    splittedData = (rawData.replace(":", " ")
+                    .replace(";", " ").replace("|", " ").replace(":", " ").replace("(", " ").replace(")", " ")
+                    .replace("[", " ").replace("]", " ").replace("{", " ").replace("}", " ").replace("?", " ")
+                    .replace("!", " ").replace("#", " ").replace("\"", " ").replace(",", ".").split())
+    numberValues = []
+    numberNames = []
+    for numberIndex in range(0, len(splittedData)):
+        if isFloat(splittedData[numberIndex]):
+            numberName = " "
+            for a in range(numberIndex - 1, -1, -1):
+                if splittedData[a].strip() == "":
+                    break
+                if isFloat(splittedData[a]):
+                    break
+                numberName = splittedData[a]
+                break
+            numberValues.append(returnFloat(splittedData[numberIndex]))
+            numberNames.append(numberName)
+    return numberNames, numberValues
+
+
+def makeTextLines(lineCount: int = 100000):
+    layouts = ["PIN: %.3f PVBIN: %.3f PVBOUT: %.3f PSET: %.3f\r\n",
+               "T1 %.2f T2 %.2f T3 %.2f | U %.3f I %.3f (state %d)\r\n",
+               "[%d] speed=%.1f rpm; temp: %.1f; error# %d\r\n",
+               "%.4f\t%.4f\t%.4f\t%.4f\t%.4f\t%.4f\t%.4f\t%.4f\r\n",
+               "%d;%.3f;%.3f;%.3f\r\n"]
+    lines = []
+    for count in range(lineCount):
+        layout = layouts[count % len(layouts)]
+        values = tuple(random.uniform(-1000, 1000) for _ in range(layout.count("%")))
+        lines.append(layout % values)
+    return lines
+
+
+def benchmarkTokenizer(filePath: str = None):
+    if filePath is not None and os.path.exists(filePath):
+        with open(filePath, 'r', encoding='utf-8', errors='replace') as file:
+            lines = file.readlines()
+    else:
+        lines = makeTextLines()
+    print("Text lines: %d" % len(lines))
+
+    startTime = time.perf_counter()
+    legacyCount = sum(len(legacyTokenize(line)[1]) for line in lines)
+    legacyDuration = time.perf_counter() - startTime
+    print("%-18s %8d numbers %9.0f lines/s" % ("replace + isFloat", legacyCount, len(lines) / legacyDuration))
+
+    tokenizer = LineTokenizer()
+    startTime = time.perf_counter()
+    count = sum(len(tokenizer.tokenize(line)[1]) for line in lines)
+    duration = time.perf_counter() - startTime
+    print("%-18s %8d numbers %9.0f lines/s (%.1fx), %d layouts cached" %
+          ("LineTokenizer", count, len(lines) / duration, legacyDuration / duration,
+           sum(len(layouts) for layouts in tokenizer.layouts.values())))
+
+
+def benchmarkTerminal(lineCount: int = 50000, burstSize: int = 200):
+    # Received lines are delivered in bursts (like queued signals from the serial threads) with the event loop
+    # running in between, so the flush timer of the terminal can fire. "per line" adds every line to the view
+    # right away, as Terminal did before batching.
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from CaptureClock import CapturedBytes
+    from SerialParameters import SerialParameters
+    from Terminal import Terminal
+
+    application = QApplication.instance() or QApplication([])
+    print("Terminal: %d lines, bursts of %d lines" % (lineCount, burstSize))
+    for portCount in (1, 4, 8):
+        ports = [SerialParameters(port="COM" + str(number + 1), baudrate=115200) for number in range(portCount)]
+        lines = [CapturedBytes(("T1 %.2f T2 %.2f U %.3f count %d\r\n" %
+                                (random.uniform(0, 100), random.uniform(0, 100), random.uniform(0, 5), count)).encode())
+                 for count in range(lineCount)]
+        for timestamps in (False, True):
+            for perLine in (True, False):
+                terminal = Terminal("Terminal: ALL", ports, "COM-ALL")
+                terminal.timestampCheckbox.setChecked(timestamps)
+                terminal.portstampCheckbox.setChecked(portCount > 1)
+                terminal.show()
+                application.processEvents()
+                startTime = time.perf_counter()
+                for first in range(0, lineCount, burstSize):
+                    for count in range(first, min(lineCount, first + burstSize)):
+                        terminal.receiveData(ports[count % portCount], lines[count])
+                        if perLine:
+                            terminal.flushLines()
+                    application.processEvents()
+                terminal.flushLines()
+                application.processEvents()
+                duration = time.perf_counter() - startTime
+                print("%d port(s) %-16s %-9s %9.0f lines/s" % (portCount, "with timestamps" if timestamps else "no timestamps",
+                                                          "per line" if perLine else "batched", lineCount / duration))
+                terminal.close()
+                terminal.deleteLater()
+
+
+if __name__ == "__main__":
+    # python Benchmark.py wu [recorded_byte_stream.bin]
+    # python Benchmark.py tokenizer [text_log.txt]
+    # python Benchmark.py terminal
+    if len(sys.argv) > 1 and sys.argv[1] == "wu":
+        benchmarkWUFrameReader(sys.argv[2] if len(sys.argv) > 2 else None)
+    elif len(sys.argv) > 1 and sys.argv[1] == "tokenizer":
+        benchmarkTokenizer(sys.argv[2] if len(sys.argv) > 2 else None)
+    elif len(sys.argv) > 1 and sys.argv[1] == "terminal":
+        benchmarkTerminal()
+    else:
+        print("Usage: python Benchmark.py wu|tokenizer [file] | terminal")
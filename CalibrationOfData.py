@@ -1,5 +1,125 @@
+import os
+import threading
+
 import numpy as np
 
+# Channels that are not calibrated by the device (Geraetekal = False) are scaled to 0..1 before calibration,
+# the scale depends on the resolution of the channel
+UNCALIBRATED_SCALES = {"Pol8": 1023, "Pol12": 4095}
+# Channels with these functions produce no calibrated value when not calibrated by the device
+SKIPPED_FUNCTIONS = ("HDA", "NTCTele")
+# Calibration method of CalibrationGroup for every function, separately for channels calibrated by the device
+# and for uncalibrated channels. Unknown functions pass the raw value through.
+DEVICE_METHODS = {"Pol": "pol", "Pol12": "pol", "Pol8": "pol", "TE": "pol", "Ube": "ube", "NTC": "deviceNTC",
+                  "G12N": "g12n", "PTC": "ptc"}
+UNCALIBRATED_METHODS = {"Pol": "pol", "Pol12": "pol", "Pol8": "pol", "NTC": "ntc", "TWS": "tws", "TE": "te",
+                        "PTC": "ptc", "RPM": "rpm", "Volt": "volt", "U5": "u5", "NTCG12": "ntcg12", "NTCBG": "ntcbg"}
+# Channel that holds the supply voltage used by NTC and G12N channels
+SUPPLY_CHANNEL = 24
+
+
+def polyval(coeff, x):
+    # Horner scheme like np.polyval, coeff has one row per power and one column per channel
+    y = coeff[0] * x
+    for row in coeff[1:-1]:
+        y = (y + row) * x
+    return y + coeff[-1]
+
+
+def steinhartHart(logR, coeff, t0):
+    return 1 / (t0 + (logR + coeff[3] * logR ** 2) / coeff[2])
+
+
+class CalibrationGroup:
+    # All channels with the same calibration method, evaluated at once for all frames.
+    # refs maps the name of a further input (e.g. the reference channel "ref") to one channel index per channel.
+    def __init__(self, method: str, channels, outputs, calibration, refs: dict):
+        self.method = method
+        self.channels = channels
+        self.outputs = outputs
+        self.refs = refs
+        self.coeff = calibration.coeff[channels].T
+        self.udcoeff = calibration.udcoeff[channels].T
+        self.uref = calibration.config['Uref'][channels]
+        self.ra = calibration.config['Ra'][channels]
+        self.ud2 = calibration.config['UD2'][channels]
+        self.scale = np.asarray([1 if calibration.config['Geraetekal'][n] else
+                                 UNCALIBRATED_SCALES.get(calibration.config['Funktion'][n], 65535) for n in channels],
+                                dtype=np.float64)
+        self.supplyCoeff = None
+        if method == "ntc":
+            self.supplyCoeff = calibration.udcoeff[SUPPLY_CHANNEL][:, None]
+        self.evaluate = getattr(self, method)
+
+    # v are the raw values of the channels, for device calibrated TE channels with their reference channel
+    # already subtracted. refs holds the values of the referenced channels.
+    def pol(self, v, refs):
+        return polyval(self.coeff, v / self.scale)
+
+    def raw(self, v, refs):
+        return v
+
+    def ube(self, v, refs):
+        return polyval(self.coeff, v / refs["ref"])
+
+    def deviceNTC(self, v, refs):
+        return self.coeff[0] + self.coeff[1] * np.log(v) + self.coeff[2] * np.log(v) ** 3
+
+    def g12n(self, v, refs):
+        return steinhartHart(np.log(self.coeff[1] * refs["supply"] / v - self.coeff[0]), self.coeff, 1 / 298.15)
+
+    def ptc(self, v, refs):
+        x = v / self.scale
+        return (self.coeff[0] + np.log(self.coeff[1]) * (1 / (x - 1)) / self.coeff[2]) ** -1
+
+    def ntc(self, v, refs):
+        x = v / self.scale
+        UB = polyval(self.supplyCoeff, refs["supply"])
+        UA = x * self.uref
+        Rth = (UB / UA - 1) * self.ra * 1e+3
+        return steinhartHart(np.log(Rth / self.coeff[0]), self.coeff, 1 / self.coeff[1])
+
+    def tws(self, v, refs):
+        x = v / self.scale
+        ref = refs["ref"]
+        x7 = np.where(ref < 1000, 42233.0 / 65535, ref / 65535)
+        Rth = (x7 * self.ud2 / x - 1) * self.ra
+        return steinhartHart(np.log(Rth / self.coeff[0]), self.coeff, 1 / self.coeff[1]) - 273.15
+
+    def te(self, v, refs):
+        x = v / self.scale - refs["ref"] / 65535
+        return polyval(self.coeff, polyval(self.udcoeff, x))
+
+    def rpm(self, v, refs):
+        return 147463800 / (v * 65536 + refs["next"])
+
+    def volt(self, v, refs):
+        x = v / self.scale
+        return polyval(self.coeff, x * 65535 / refs["ref"])
+
+    def u5(self, v, refs):
+        return 2.5 * 1023 / v
+
+    def ntcg12(self, v, refs):
+        mw = np.where(v != 0, refs["ref"] / np.where(v != 0, v, 1), 0)
+        return steinhartHart(np.log(self.coeff[1] * mw - self.coeff[0]), self.coeff, 1 / 298.15) - 273.15
+
+    def ntcbg(self, v, refs):
+        mw = v / refs["ref"]
+        return steinhartHart(np.log(self.coeff[0] / (mw - 1) - self.coeff[1]), self.coeff, 1 / 298.15) - 273.15
+
+
+# Attributes of a parsed calibration file that are shared by all CalibrationOfData instances using it
+SHARED_ATTRIBUTES = ("config", "coeff", "udcoeff", "ndsl", "fileKey", "plan", "teChannels", "outputCount",
+                     "planValid", "resolvedPlans")
+
+
+class ResolvedPlan:
+    # Calibration plan with all channel references turned into column indices for a given frame length
+    def __init__(self, teSteps, groups):
+        self.teSteps = teSteps
+        self.groups = groups
+
 
 class CalibrationOfData():
     def __init__(self):
@@ -11,8 +131,28 @@ class CalibrationOfData():
         self.ndsl = 0
         self.fileName = ""
         self.pathName = ""
+        self.fileKey = None
+
+        self.plan = []
+        self.teChannels = np.zeros(0, dtype=np.int64)
+        self.outputCount = 0
+        self.planValid = False
+        self.resolvedPlans = {}
 
     def readCalibrationFile(self, filepath: str):
+        # The file is parsed only once, all instances that load it share the parsed calibration
+        calibration = calibrationRegistry.getCalibration(filepath)
+        if calibration is None:
+            print("Could not load calibration file!")
+            return None
+        for name in SHARED_ATTRIBUTES:
+            setattr(self, name, getattr(calibration, name))
+        self.fileName = filepath.split('/')[len(filepath.split('/')) - 1]
+        self.pathName = filepath
+        self.configured = True
+        return True
+
+    def parseCalibrationFile(self, filepath: str):
         try:
             self.config = np.genfromtxt(filepath, skip_header=1, delimiter=',',
                                         dtype=(np.dtype('U5'), np.dtype('U10'), float, float, float, float, float, float,
@@ -25,14 +165,94 @@ class CalibrationOfData():
 
             self.ndsl = len(self.config['Kanal'])
 
+            self.compilePlan()
+
             self.fileName = filepath.split('/')[len(filepath.split('/')) - 1]
             self.pathName = filepath
             self.configured = True
             return True
         except:
-            print("Could not load calibration file!")
             return None
 
+    def compilePlan(self):
+        # Groups the channels by calibration method, so calibrateArray needs one NumPy evaluation per group
+        # instead of a Python loop over all channels
+        groupChannels = {}
+        outputs = {}
+        for n in range(self.ndsl):
+            function = self.config['Funktion'][n]
+            if self.config['Geraetekal'][n]:
+                method = DEVICE_METHODS.get(function, "raw")
+            elif function in SKIPPED_FUNCTIONS:
+                continue
+            else:
+                method = UNCALIBRATED_METHODS.get(function, "raw")
+            groupChannels.setdefault(method, []).append(n)
+            outputs[n] = len(outputs)
+
+        teKan = self.config['TEkan']
+        plan = []
+        self.planValid = True
+        for method, channels in groupChannels.items():
+            channels = np.asarray(channels, dtype=np.int64)
+            refs = {}
+            if method in ("ube", "tws", "te", "volt", "ntcg12", "ntcbg"):
+                refs["ref"] = teKan[channels] - 2
+            if method in ("g12n", "ntc"):
+                if method == "ntc" and self.ndsl <= SUPPLY_CHANNEL:
+                    # The supply channel is not calibrated, like before every frame fails with an IndexError
+                    self.planValid = False
+                    continue
+                refs["supply"] = np.full(len(channels), SUPPLY_CHANNEL, dtype=np.int64)
+            if method == "rpm":
+                refs["next"] = channels + 1
+            plan.append(CalibrationGroup(method, channels, np.asarray([outputs[n] for n in channels], dtype=np.int64),
+                                         self, refs))
+
+        self.plan = plan
+        # Device calibrated TE channels subtract their reference channel in place, later channels see the result
+        self.teChannels = np.asarray([n for n in range(self.ndsl) if self.config['Geraetekal'][n] and
+                                      self.config['Funktion'][n] == 'TE'], dtype=np.int64)
+        self.outputCount = len(outputs)
+        self.resolvedPlans = {}
+
+    def resolvePlan(self, width: int):
+        # Turns channel references (which may be negative like Python list indices) into column indices of
+        # np.concatenate((data, teData), axis=1), teData holding the values after the in place TE subtraction.
+        # Returns None if a referenced channel does not exist in frames of this length.
+        if width in self.resolvedPlans:
+            return self.resolvedPlans[width]
+        if not self.planValid:
+            return None
+
+        isTE = np.zeros(width, dtype=bool)
+        teSteps = []
+        resolved = None
+        try:
+            for n in self.teChannels:
+                source = int(self.config['TEkan'][n])
+                if n >= width or not -width <= source < width:
+                    raise IndexError
+                teSteps.append((int(n), source % width))
+                isTE[n] = True
+
+            def columns(references, readers):
+                if np.any(references >= width) or np.any(references < -width):
+                    raise IndexError
+                references = references % width
+                # Values of TE channels are read after the subtraction if that channel came first
+                return references + width * (isTE[references] & (references <= readers))
+
+            groups = []
+            for group in self.plan:
+                refs = {name: columns(references, group.channels) for name, references in group.refs.items()}
+                groups.append((group, columns(group.channels, group.channels), refs))
+            resolved = ResolvedPlan(teSteps, groups)
+        except IndexError:
+            pass
+        self.resolvedPlans[width] = resolved
+        return resolved
+
     def getName(self, index: int):
         if index < len(self.config['Name']):
             return self.config['Name'][index]
@@ -46,107 +266,142 @@ class CalibrationOfData():
     def calibrate(self, data: []):
         if not self.configured:
             return None
-        calData = []
         try:
-            n = 0
-            for element in self.config['Geraetekal']:
-                if element:
-                    if self.config['Funktion'][n] == 'Pol':
-                        calData.append(np.polyval(self.coeff[n, :], data[n]))
-                    elif self.config['Funktion'][n] == 'Ube':
-                        x = data[n]/data[self.config['TEkan'][n]-2]
-                        calData.append(np.polyval(self.coeff[n, :], x))
-                    elif self.config['Funktion'][n] == 'NTC':
-                        calData.append(self.coeff[n, 0] + self.coeff[n, 1] * np.log(data[n])
-                                   + self.coeff[n, 2] * np.log(data[n]) ** 3)
-                    elif self.config['Funktion'][n] == 'G12N':
-                        calData.append((1/(1/298.15 + (np.log(self.coeff[n, 1]*data[24]/data[n]-self.coeff[n, 0]) +self.coeff[n, 3]*np.log(self.coeff[n, 1]*data[24]/data[n]-self.coeff[n, 0])**2)/self.coeff[n, 2])))
-                    elif self.config['Funktion'][n] == 'PTC':
-                        x = data[n]
-                        calData.append((self.coeff[n, 0] + np.log(self.coeff[n, 1])*(1/(x-1))/self.coeff[n, 2])**-1)
-                    elif self.config['Funktion'][n] == 'TE':
-                        data[n] -= data[self.config['TEkan'][n]]
-                        calData.append(np.polyval(self.coeff[n, :], data[n]))
-                    elif self.config['Funktion'][n] == 'Pol12':
-                        calData.append(np.polyval(self.coeff[n, :], data[n]))
-                    elif self.config['Funktion'][n] == 'Pol8':
-                        calData.append(np.polyval(self.coeff[n, :], data[n]))
-                    else:
-                        calData.append(data[n])
-                else:
-                    if self.config['Funktion'][n]== 'Pol8':
-                        x = data[n] / 1023
-                    elif self.config['Funktion'][n]== 'Pol12':
-                        x = data[n] / 4095
-                    else:
-                        x = data[n] / 65535
-                    if self.config['Funktion'][n] == 'Pol':
-                        calData.append(np.polyval(self.coeff[n, :], x))
-                    elif self.config['Funktion'][n] == 'NTC':
-                        try:
-                            UB = np.polyval(self.udcoeff[24, :], data[24])
-                            UA = x*self.config['Uref'][n]
-                            Rth = (UB / UA - 1) * self.config['Ra'][n] * 1e+3
-                            calData.append(1/(1/self.coeff[n, 1] + (np.log(Rth/self.coeff[n, 0]) + self.coeff[n, 3] * np.log(Rth/self.coeff[n, 0]) ** 2)/self.coeff[n, 2]))
-                        except RuntimeWarning as e:
-                            print('Error occured: ' + str(e) + 'x =' + str(x))
-                    elif self.config['Funktion'][n] == 'TWS':
-                        try:
-                            if data[self.config['TEkan'][n]-2] < 1000:
-                                x7 = 42233.0 / 65535
-                            else:
-                                x7 = data[self.config['TEkan'][n]-2]/65535
-                            Rth = (x7 * self.config['UD2'][n]/ x - 1) * self.config['Ra'][n]
-                            T = (1/self.coeff[n, 1] + (np.log(Rth/self.coeff[n, 0]) + self.coeff[n, 3] * np.log(Rth/self.coeff[n, 0]) ** 2)
-                                            /self.coeff[n, 2])**-1-273.15
-                            calData.append(T)
-                        except RuntimeWarning as e:
-                            print('Error occured: ' + str(e) + 'x =' + str(x))
-                    elif self.config['Funktion'][n] == 'TE':
-                        x -= data[self.config['TEkan'][n]-2] / 65535
-                        x = np.polyval(self.udcoeff[n, :], x)
-                        calData.append(np.polyval(self.coeff[n, :], x))
-                    elif self.config['Funktion'][n] == 'PTC':
-                        calData.append((self.coeff[n, 0] + np.log(self.coeff[n, 1])*(1/(x-1))/self.coeff[n, 2])**-1)
-                    elif self.config['Funktion'][n] == 'Pol12':
-                        calData.append(np.polyval(self.coeff[n, :], x))
-                    elif self.config['Funktion'][n] == 'Pol8':
-                        calData.append(np.polyval(self.coeff[n, :], x))
-                    elif self.config['Funktion'][n] == "RPM":
-                        rpm = 147463800/(data[n] * 65536 + data[n+1])
-                        calData.append(rpm)
-                    elif self.config['Funktion'][n] == "HDA":
-                        Uhd = 4.08*1.33
-                    elif self.config['Funktion'][n] == "Volt":
-                        calData.append(np.polyval(self.coeff[n, :], x*65535/data[self.config['TEkan'][n]-2]))
-                    elif self.config['Funktion'][n] == "U5":
-                        calData.append(2.5*1023/data[n])
-                    elif self.config['Funktion'][n] == "NTCTele":
-                        pass
-                        #(1/(A0 + np.log(A1*(1/(mw/1023)-1))/A2))
-                    elif self.config['Funktion'][n] == "NTCG12":
-                        if data[n] != 0:
-                            mw = data[self.config['TEkan'][n]-2]/data[n]
-                        else:
-                            mw = 0
-                        calData.append((1/(1/298.15 + (np.log(self.coeff[n, 1]*mw-self.coeff[n,0])+self.coeff[n, 3]*np.log(self.coeff[n, 1]*mw-self.coeff[n, 0])**2)/self.coeff[n,2]))-273.15)
-                    elif self.config['Funktion'][n] == "NTCBG":
-                        mw = data[n]/data[self.config['TEkan'][n]-2]
-                        calData.append(1/(1/298.15 + (np.log(self.coeff[n, 0]/(mw-1)-self.coeff[n, 1])+self.coeff[n, 3]*np.log(self.coeff[n, 0]/(mw-1)-self.coeff[n, 1])**2)/self.coeff[n,2])-273.15)
-
-                    else:
-                        calData.append(data[n])
-                n += 1
-            return np.asarray(calData)
-        except ValueError:
-            print("ValueError")
+            calData = self.calibrateArray(np.asarray(data, dtype=np.float64).reshape(1, -1))
+        except (ValueError, TypeError):
+            print("Calibration failed: invalid data")
             return None
-        except TypeError:
-            print("TypeError")
+        if calData is None:
             return None
-        except IndexError:
+        return calData[0]
+
+    def calibrateFrame(self, port: str, frame):
+        # Calibrates a WUFrame once for all tabs using the same calibration file on this port.
+        # The returned array is shared, it must not be modified.
+        if not self.configured:
+            return None
+        return calibrationRegistry.calibrateFrame(self, port, frame)
+
+    def calibrateArray(self, data):
+        # data: (frames, channels) raw values, returns a (frames, calibrated channels) float64 array.
+        # Invalid results (e.g. division by zero) become inf or nan.
+        if not self.configured:
+            return None
+        data = np.asarray(data, dtype=np.float64)
+        resolved = self.resolvePlan(data.shape[1])
+        if resolved is None:
             print("IndexError")
             return None
-        except:
-            print("Calibration failed: unknown reason")
+
+        if resolved.teSteps:
+            teData = data.copy()
+            for channel, source in resolved.teSteps:
+                teData[:, channel] -= teData[:, source]
+            source = np.concatenate((data, teData), axis=1)
+        else:
+            source = data
+
+        calData = np.empty((len(data), self.outputCount), dtype=np.float64)
+        with np.errstate(all='ignore'):
+            for group, own, refs in resolved.groups:
+                calData[:, group.outputs] = group.evaluate(source[:, own],
+                                                           {name: source[:, columns] for name, columns in refs.items()})
+        return calData
+
+    def calibrateBatch(self, data, chunkSize: int = 65536, out=None):
+        # Calibrates a (frames, channels) array, e.g. RdqReader.values or another np.memmap, chunkSize frames at
+        # a time, so only one chunk is converted to float64 at once. out can be a preallocated
+        # (frames, outputCount) array or np.memmap to keep the result out of memory as well.
+        if not self.configured:
+            return None
+        if self.resolvePlan(data.shape[1]) is None:
+            print("IndexError")
             return None
+        if out is None:
+            out = np.empty((len(data), self.outputCount), dtype=np.float64)
+        for first in range(0, len(data), chunkSize):
+            out[first:first + chunkSize] = self.calibrateArray(data[first:first + chunkSize])
+        return out
+
+    def iterCalibrated(self, blocks):
+        # Calibrates blocks of frames as yielded by TextRecording.iterFrames, (values, crcOk) tuples stay tuples
+        for block in blocks:
+            if isinstance(block, tuple):
+                calData = self.calibrateArray(block[0])
+                if calData is None:
+                    return
+                yield (calData,) + block[1:]
+            else:
+                calData = self.calibrateArray(block)
+                if calData is None:
+                    return
+                yield calData
+
+
+class CalibrationRegistry:
+    # Process wide cache shared by all tabs and ports. Every calibration file is parsed once per modification
+    # time and every frame is calibrated once per (port, Kennbin, calibration file).
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calibrations = {}
+        self.lastResults = {}
+
+    def getCalibration(self, filePath: str):
+        try:
+            fileKey = (os.path.abspath(filePath), os.path.getmtime(filePath))
+        except OSError:
+            return None
+        with self.lock:
+            calibration = self.calibrations.get(fileKey)
+        if calibration is not None:
+            return calibration
+
+        calibration = CalibrationOfData()
+        if calibration.parseCalibrationFile(filePath) is None:
+            return None
+        calibration.fileKey = fileKey
+        with self.lock:
+            # Drop older versions of the same file
+            for key in [key for key in self.calibrations if key[0] == fileKey[0]]:
+                del self.calibrations[key]
+            self.calibrations[fileKey] = calibration
+        return calibration
+
+    def calibrateFrame(self, calibration: CalibrationOfData, port: str, frame):
+        # Frames calibrated in the acquisition thread carry their calibrated values
+        if frame.calibrationKey is not None and frame.calibrationKey == calibration.fileKey:
+            return frame.calValues
+
+        key = (port, frame.Kennbin, calibration.fileKey)
+        with self.lock:
+            lastResult = self.lastResults.get(key)
+        if lastResult is not None and lastResult[0] is frame:
+            return lastResult[1]
+
+        calData = calibration.calibrate(frame.values)
+        if calData is not None:
+            calData.flags.writeable = False
+        frame.calValues = calData
+        frame.calibrationKey = calibration.fileKey
+        with self.lock:
+            self.lastResults[key] = (frame, calData)
+        return calData
+
+    def clear(self):
+        with self.lock:
+            self.calibrations.clear()
+            self.lastResults.clear()
+
+
+calibrationRegistry = CalibrationRegistry()
+
+
+def loadPortCalibration(serialParameters):
+    # Calibration a serial/replay thread applies to its WU frames, None if calibrating in the thread is off
+    if not serialParameters.calibrateInThread or serialParameters.calibrationFilePath == "":
+        return None
+    calibration = CalibrationOfData()
+    calibration.port = serialParameters.port
+    if calibration.readCalibrationFile(serialParameters.calibrationFilePath) is None:
+        return None
+    return calibration
@@ -0,0 +1,57 @@
+from datetime import datetime
+from time import perf_counter, time
+
+import numpy as np
+
+# Capture timestamps are perf_counter() seconds: monotonic and high resolution, but with an arbitrary origin.
+# They are taken in the acquisition thread when the data is read and travel with the data (WUFrame.timestamp,
+# CapturedBytes.timestamp), so queued signals and throttling do not shift them.
+captureTime = perf_counter
+
+# Wall clock time at capture time 0, taken once so all conversions of a session agree
+WALL_CLOCK_OFFSET = time() - perf_counter()
+
+
+def toWallClock(timestamps):
+    # Capture timestamps (float or array) to seconds since the epoch
+    if isinstance(timestamps, (int, float)):
+        return timestamps + WALL_CLOCK_OFFSET
+    return np.asarray(timestamps, dtype=np.float64) + WALL_CLOCK_OFFSET
+
+
+def fromWallClock(wallTimes):
+    # Seconds since the epoch (float or array) to capture timestamps
+    if isinstance(wallTimes, (int, float)):
+        return wallTimes - WALL_CLOCK_OFFSET
+    return np.asarray(wallTimes, dtype=np.float64) - WALL_CLOCK_OFFSET
+
+
+def timestampOf(data):
+    # Capture timestamp of received data, now for data that carries none (e.g. emitted by older sources)
+    timestamp = getattr(data, "timestamp", None)
+    if timestamp is None:
+        return captureTime()
+    return timestamp
+
+
+class CapturedBytes(bytes):
+    # Received text data with the capture timestamp of its read
+    def __new__(cls, data: bytes, timestamp: float = None):
+        capturedBytes = super().__new__(cls, data)
+        capturedBytes.timestamp = captureTime() if timestamp is None else timestamp
+        return capturedBytes
+
+
+class TimestampFormatter:
+    # strftime of wall clock times for formats with one second resolution, formatted only once per second
+    def __init__(self, format: str):
+        self.format = format
+        self.second = None
+        self.text = ""
+
+    def __call__(self, wallTime: float):
+        second = int(wallTime // 1)
+        if second != self.second:
+            self.second = second
+            self.text = datetime.fromtimestamp(second).strftime(self.format)
+        return self.text
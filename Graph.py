@@ -3,13 +3,12 @@ import random
 import time
 import uuid
 
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QSettings
+from PyQt5.QtCore import Qt, pyqtSignal, QSettings, QThreadPool
 from PyQt5.QtGui import QColor, QPalette, QFont
 from PyQt5.QtWidgets import QComboBox, QHBoxLayout, QApplication, QVBoxLayout, QRadioButton, QCheckBox, QPushButton, \
     QFileDialog, QFormLayout, QWidget, QLabel, QLineEdit, QSpinBox, QColorDialog, QGroupBox, QTableWidget, QMessageBox, \
-    QSplitter, QDoubleSpinBox
+    QSplitter, QDoubleSpinBox, QProgressDialog
 from pyqtgraph import PlotWidget, mkPen, exporters
-from datetime import datetime
 
 from CalibrationFileLabel import CalibrationFileLabel
 from CalibrationFilePushButton import CalibrationFilePushButton
@@ -19,6 +18,14 @@ from GraphOptionsWindow import GraphOptionsWindow
 from UsefulFunctions import *
 from CalibrationOfData import *
 from FindDataOptionsWindow import FindDataOptionsWindow
+from RingBuffer import RingBuffer
+from MinMaxPyramid import MinMaxPyramid
+from GraphHistory import GraphHistory, SEGMENT_SIZE
+from GraphExport import GraphExportThread
+from RenderClock import RenderClock
+from LineTokenizer import LineTokenizer
+from CaptureClock import captureTime, toWallClock, timestampOf
+import numpy as np
 
 
 class PortCombobox(QComboBox):
@@ -47,12 +54,22 @@ class PortCombobox(QComboBox):
 
 
 class GraphLine:
+    # Columns of the ring buffer
+    X = 0
+    X_TIME = 1
+    X_INDEX = 2
+    Y = 3
+    # With maxValueCount "All" at most this many samples (and one segment more) stay in memory,
+    # older ones are moved to the history on disk
+    MEMORY_VALUE_COUNT = 4 * SEGMENT_SIZE
+    # Finest pyramid levels that are dropped for samples in the history
+    HISTORY_DROPPED_LEVELS = 3
+
     def __init__(self, name: str, timestamp=None):
         self.name = name
-        self.x = []
-        self.x_time = []
-        self.x_index = []
-        self.y = []
+        self.buffer = RingBuffer(300, 4)
+        self.pyramid = MinMaxPyramid(300)
+        self.history = GraphHistory(4, (self.X_TIME, self.X_INDEX))
         self.dataLine = None
 
         self.id = str(uuid.uuid1())
@@ -67,41 +84,129 @@ class GraphLine:
         self.symbolSize = 12
         self.fillLevel = None
         self.fillLevelBrush = QColor(120, 120, 120, 100)
-        self.maxValueCount = 300
         self.timestamp = timestamp
         self.changed = False
-
-    def appendDataPoint(self, y: float, x: float = -1):
-        if len(self.x) > self.maxValueCount > 0:
-            self.x = self.x[-self.maxValueCount:]
-            self.x_time = self.x_time[-self.maxValueCount:]
-            self.x_index = self.x_index[-self.maxValueCount:]
-            self.x.append(x)
-
-            if self.timestamp is not None:
-                self.x_time.append(datetime.now().timestamp() - self.timestamp)
-            else:
-                self.x_time.append(datetime.now().timestamp())
-
-            if len(self.x_index) > 0:
-                self.x_index.append(self.x_index[-1] + 1)
-            else:
-                self.x_index.append(0)
-
-            self.y = self.y[-self.maxValueCount:]
-            self.y.append(y)
+        # New samples since the line was last sent to pyqtgraph
+        self.dirty = False
+        self.nextIndex = 0
+
+    # x, x_time, x_index and y are views into the ring buffer, valid until the next append
+    @property
+    def x(self):
+        return self.buffer.view(self.X)
+
+    @property
+    def x_time(self):
+        return self.buffer.view(self.X_TIME)
+
+    @property
+    def x_index(self):
+        return self.buffer.view(self.X_INDEX)
+
+    @property
+    def y(self):
+        return self.buffer.view(self.Y)
+
+    @property
+    def maxValueCount(self):
+        return self.buffer.capacity
+
+    @maxValueCount.setter
+    def maxValueCount(self, maxValueCount: int):
+        # 0 keeps all values
+        if maxValueCount == self.buffer.capacity:
+            return
+        if len(self.history) > 0:
+            # Back to a limited count: the newest values that fit are taken from the history into memory
+            buffer = RingBuffer(maxValueCount, 4)
+            if maxValueCount > len(self.buffer):
+                buffer.extend(*self.history.read(self.nextIndex - maxValueCount, self.memoryFirstIndex()))
+            buffer.extend(*self.buffer.views())
+            self.buffer = buffer
+            self.history.clear()
+            self.pyramid.clear()
         else:
-            self.x.append(x)
-
-            if self.timestamp is not None:
-                self.x_time.append(datetime.now().timestamp() - self.timestamp)
-            else:
-                self.x_time.append(datetime.now().timestamp())
-            if len(self.x_index) > 0:
-                self.x_index.append(self.x_index[-1] + 1)
-            else:
-                self.x_index.append(0)
-            self.y.append(y)
+            self.buffer.setCapacity(maxValueCount)
+        self.pyramid.setCapacity(maxValueCount)
+
+    def appendDataPoint(self, y: float, x: float = -1, timestamp: float = None):
+        # timestamp: capture time of the sample (CaptureClock), now if not known
+        if timestamp is None:
+            timestamp = captureTime()
+        if self.timestamp is not None:
+            x_time = timestamp - self.timestamp
+        else:
+            x_time = toWallClock(timestamp)
+        self.buffer.append(x, x_time, self.nextIndex, y)
+        self.nextIndex += 1
+        self.dirty = True
+        if self.buffer.capacity == 0 and len(self.buffer) >= self.MEMORY_VALUE_COUNT + SEGMENT_SIZE:
+            self.spillOldestSegment()
+
+    def spillOldestSegment(self):
+        # The pyramid has to cover the samples before they leave memory, its coarse levels stay in memory
+        firstIndex = self.memoryFirstIndex()
+        self.pyramid.update(self.y, firstIndex)
+        self.history.spill(self.buffer.data[:, self.buffer.start:self.buffer.start + SEGMENT_SIZE], firstIndex)
+        self.buffer.discard(SEGMENT_SIZE)
+        self.pyramid.dropFineBlocks(firstIndex + SEGMENT_SIZE, self.HISTORY_DROPPED_LEVELS)
+
+    def memoryFirstIndex(self):
+        return self.nextIndex - len(self.buffer)
+
+    def firstIndex(self):
+        # Absolute index of the oldest stored sample, in memory or in the history
+        if len(self.history) > 0:
+            return self.history.startIndex
+        return self.memoryFirstIndex()
+
+    def searchsorted(self, column: int, value: float, side: str = 'left'):
+        # np.searchsorted over all stored samples of an ascending column (X_TIME, X_INDEX), as absolute index
+        memory = self.buffer.view(column)
+        if len(self.history) > 0 and (len(memory) == 0 or value < memory[0] or (side == 'left' and value == memory[0])):
+            return self.history.searchsorted(column, value, side)
+        return self.memoryFirstIndex() + int(np.searchsorted(memory, value, side))
+
+    def samples(self, column: int, start: int, end: int):
+        # x of column and y of the samples [start, end)
+        memoryFirstIndex = self.memoryFirstIndex()
+        if start >= memoryFirstIndex:
+            return self.buffer.view(column)[start - memoryFirstIndex:end - memoryFirstIndex], \
+                self.y[start - memoryFirstIndex:end - memoryFirstIndex]
+        return self.take(column, np.arange(start, end))
+
+    def take(self, column: int, indices):
+        # x of column and y of the samples at the ascending absolute indices, paging in the history if needed
+        memoryFirstIndex = self.memoryFirstIndex()
+        split = int(np.searchsorted(indices, memoryFirstIndex))
+        memoryIndices = indices[split:] - memoryFirstIndex
+        xData = self.buffer.view(column)[memoryIndices]
+        yData = self.y[memoryIndices]
+        if split > 0:
+            historySamples = self.history.take(indices[:split])
+            xData = np.concatenate((historySamples[column], xData))
+            yData = np.concatenate((historySamples[self.Y], yData))
+        return xData, yData
+
+    def clear(self):
+        self.buffer.clear()
+        self.history.clear()
+        self.pyramid.clear()
+        self.nextIndex = 0
+        self.dirty = True
+
+
+# Seconds between redraws of the plot update settings, "On input" redraws on request
+PLOT_UPDATE_INTERVALS = {"30ms": 0.03, "50ms": 0.05, "100ms": 0.1, "200ms": 0.2, "500ms": 0.5, "1s": 1, "2s": 2,
+                         "5s": 5, "10s": 10, "20s": 20, "30s": 30, "1m": 60, "2m": 120, "5m": 300, "10m": 600}
+
+
+class WUChannelSelection:
+    # Checked WU channels of the table for one port and channel count: their names and frame indices
+    def __init__(self, key, names: list, indices: list):
+        self.key = key
+        self.names = names
+        self.indices = np.array(indices, dtype=np.intp)
 
 
 class Graph(Tab):
@@ -114,21 +219,25 @@ class Graph(Tab):
         self.port = port
         self.dataFindMethod = "Automatic"
         self.useDruckbox2Bool = False
+        self.lineTokenizer = LineTokenizer()
 
         self.graphLines: list[GraphLine] = []
+        # name -> GraphLine, rebuilt by indexGraphLines whenever lines are renamed or removed
+        self.graphLinesByName: dict[str, GraphLine] = {}
         self.title = None
         self.titleSize = "15pt"
         self.axisLabelText_x = None
         self.axisLabelText_y = None
         self.axisLabelSize = "9pt"
-        self.timestamp = datetime.now().timestamp()
+        self.timestamp = captureTime()
         self.maxShownValues = 300
         self.showGridBool = False
         self.showLegendBool = True
         self.plotValueString = "Time"
         self.plotUpdateString = "On input"
-        self.plotUpdatetimer = QTimer()
-        self.plotUpdatetimer.timeout.connect(self.plotGraph)
+        # Redraws are done by the shared RenderClock
+        self.redrawPending = False
+        self.lastRenderStatsTime = 0
 
         # Colors
         self.backgroundColor = QApplication.palette().color(QPalette.Base)
@@ -151,6 +260,10 @@ class Graph(Tab):
 
         self.wuLayoutshow = False
         self.calibration = CalibrationOfData()
+        # WUChannelSelection per (port, channel count), rebuilt from the table only when a checkbox toggles or
+        # the table or calibration (wuSelectionCalibration) changes
+        self.wuSelections = {}
+        self.wuSelectionCalibration = None
         self.receivedData = []
         self.receivedValueData = []
         self.receivedCalValueData = []
@@ -207,6 +320,7 @@ class Graph(Tab):
 
         self.graphWidget = PlotWidget()
         self.graphWidget.addLegend()
+        self.graphWidget.plotItem.vb.sigXRangeChanged.connect(self.xRangeChanged)
 
         self.shownTypeCB = QComboBox()
         self.shownTypeCB.addItem("Show: Values")
@@ -272,10 +386,14 @@ class Graph(Tab):
         self.exportButton = QPushButton("Save as")
         self.exportButton.clicked.connect(self.exportAs)
 
+        self.renderStatsLabel = QLabel("")
+        self.renderStatsLabel.setStyleSheet("color: #808080")
+
         optionsLayout2 = QHBoxLayout()
         optionsLayout2.addWidget(self.loadCalibrationButton)
         optionsLayout2.addWidget(self.loadCalibrationText)
         optionsLayout2.addStretch()
+        optionsLayout2.addWidget(self.renderStatsLabel)
         optionsLayout2.addWidget(self.exportButton)
 
         mainLayout = QVBoxLayout()
@@ -362,55 +480,110 @@ class Graph(Tab):
                                               brush=line.fillLevelBrush,
                                               name=line.name)
         self.graphLines.append(line)
-
-    def plotGraph(self):
+        self.graphLinesByName[line.name] = line
+        return line
+
+    def indexGraphLines(self):
+        self.graphLinesByName = {line.name: line for line in self.graphLines}
+
+    def graphLineByName(self, name: str):
+        # The line of that name, created on first use
+        line = self.graphLinesByName.get(name)
+        if line is None:
+            line = self.createGraphLine(name)
+        return line
+
+    def lineData(self, line: GraphLine, pixelWidth: int):
+        yData = line.y
+        if self.plotValueString == "Value":
+            start = 0
+            end = len(yData)
+            if self.maxShownValues is not None and end > self.maxShownValues:
+                start = end - self.maxShownValues
+            return line.x[start:end], yData[start:end]
+
+        # Time and index are ascending: only the visible part is sent to pyqtgraph, long histories
+        # as min/max envelope of about two points per pixel. Samples are addressed by absolute index here,
+        # older ones may have to be paged in from the line's history.
+        column = GraphLine.X_TIME if self.plotValueString == "Time" else GraphLine.X_INDEX
+        start = line.firstIndex()
+        end = line.nextIndex
+        if self.maxShownValues is not None and end - start > self.maxShownValues:
+            start = end - self.maxShownValues
+        viewBox = self.graphWidget.plotItem.vb
+        if not viewBox.autoRangeEnabled()[0]:
+            xMin, xMax = viewBox.viewRange()[0]
+            start = max(start, line.searchsorted(column, xMin, 'left') - 1)
+            end = min(end, line.searchsorted(column, xMax, 'right') + 1)
+            if end <= start:
+                return yData[0:0], yData[0:0]
+        line.pyramid.update(yData, line.memoryFirstIndex())
+        indices = line.pyramid.decimate(start, end, pixelWidth)
+        if indices is None:
+            return line.samples(column, start, end)
+        return line.take(column, indices)
+
+    def xRangeChanged(self):
+        # Panning or zooming shows other samples, the visible part and its level of detail have to be sent again
+        if not self.graphWidget.plotItem.vb.autoRangeEnabled()[0]:
+            self.plotGraph(True)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.redrawPending:
+            self.plotGraph(True)
+
+    def closeEvent(self, event):
+        RenderClock.instance().unregister(self)
+        super().closeEvent(event)
+
+    def updateRenderStats(self):
+        # Frame times measured by the RenderClock, refreshed once per second
+        now = time.perf_counter()
+        if now < self.lastRenderStatsTime + 1:
+            return
+        self.lastRenderStatsTime = now
+        stats = RenderClock.instance().frameStats(self)
+        if stats is not None and stats.count > 0:
+            self.renderStatsLabel.setText("Render: %.1f ms" % (stats.average * 1e3))
+            self.renderStatsLabel.setToolTip(str(stats))
+
+    def plotGraph(self, force: bool = False):
+        # Only lines with new samples are sent to pyqtgraph (all lines if force), hidden tabs are redrawn when shown
+        if not self.isVisible():
+            self.redrawPending = True
+            return
+        self.redrawPending = False
+        self.updateRenderStats()
+        pixelWidth = int(self.graphWidget.plotItem.vb.width())
+        if any(line.visible and line.changed for line in self.graphLines):
+            # Pen, symbol or fill changed: all lines are created again, from the same data as an update
+            self.graphWidget.plotItem.clear()
+            for line in self.graphLines:
+                line.changed = False
+                pen = mkPen(color=line.lineColor, width=line.lineWidth, style=line.lineStyle)
+                line.dataLine = self.graphWidget.plot(*self.lineData(line, pixelWidth), pen=pen, symbol=line.symbol,
+                                                      symbolSize=line.symbolSize,
+                                                      symbolBrush=line.symbolBrush,
+                                                      symbolPen=line.symbolPen,
+                                                      fillLevel=line.fillLevel,
+                                                      brush=line.fillLevelBrush,
+                                                      name=line.name)
+                line.dirty = False
+            return
         for line in self.graphLines:
-            if line.visible:
-                if line.dataLine is not None:
-                    if self.maxShownValues is not None and len(line.x) > self.maxShownValues:
-                        if self.plotValueString == "Value":
-                            line.dataLine.setData(line.x[-self.maxShownValues:], line.y[-self.maxShownValues:])
-                        elif self.plotValueString == "Time":
-                            line.dataLine.setData(line.x_time[-self.maxShownValues:], line.y[-self.maxShownValues:])
-                        elif self.plotValueString == "Index":
-                            line.dataLine.setData(line.x_index[-self.maxShownValues:], line.y[-self.maxShownValues:])
-                    else:
-                        if self.plotValueString == "Value":
-                            line.dataLine.setData(line.x, line.y)
-                        elif self.plotValueString == "Time":
-                            line.dataLine.setData(line.x_time, line.y)
-                        elif self.plotValueString == "Index":
-                            line.dataLine.setData(line.x_index, line.y)
-                if line.changed:
-                    line.changed = False
-                    self.graphWidget.plotItem.clear()
-                    for line in self.graphLines:
-                        pen = mkPen(color=line.lineColor, width=line.lineWidth, style=line.lineStyle)
-                        if self.plotValueString == "Value":
-                            xData = line.x
-                        elif self.plotValueString == "Time":
-                            xData = line.x_time
-                        elif self.plotValueString == "Index":
-                            xData = line.x_index
-
-                        line.dataLine = self.graphWidget.plot(xData, line.y, pen=pen, symbol=line.symbol,
-                                                              symbolSize=line.symbolSize,
-                                                              symbolBrush=line.symbolBrush,
-                                                              symbolPen=line.symbolPen,
-                                                              fillLevel=line.fillLevel,
-                                                              brush=line.fillLevelBrush,
-                                                              name=line.name)
+            if line.visible and line.dataLine is not None and (force or line.dirty):
+                line.dataLine.setData(*self.lineData(line, pixelWidth))
+                line.dirty = False
 
     def clearAllData(self):
         self.colorIndex = 0
         for line in self.graphLines:
             if line.dataLine is not None:
                 line.dataLine.clear()
-                line.x.clear()
-                line.x_time.clear()
-                line.x_index.clear()
-                line.y.clear()
+                line.clear()
         self.graphLines.clear()
+        self.graphLinesByName.clear()
         self.graphWidget.plotItem.clear()
         self.plotGraph()
 
@@ -418,10 +591,7 @@ class Graph(Tab):
         for line in self.graphLines:
             if line.dataLine is not None:
                 line.dataLine.clear()
-                line.x.clear()
-                line.x_time.clear()
-                line.x_index.clear()
-                line.y.clear()
+                line.clear()
         self.plotGraph()
 
     def setGraphBounds(self, xRangeMin=None, xRangeMax=None, yRangeMin=None, yRangeMax=None):
@@ -470,7 +640,7 @@ class Graph(Tab):
 
     def exportAs(self):
         fname = QFileDialog.getSaveFileName(self, 'Save file', 'C:\\Users\\Tim\\Desktop',
-                                            "Image files (*.png *.jpg *.tif *.svg *.csv)")
+                                            "Image files (*.png *.jpg *.tif *.svg);;Data files (*.csv *.npz)")
         if fname[0] != '':
             extension = os.path.splitext(fname[0])[1]
             if extension.upper() == ".PNG" or extension.upper() == ".JPG" or extension.upper() == ".TIFF" or extension.upper() == ".TIF":
@@ -479,9 +649,23 @@ class Graph(Tab):
             if extension.upper() == ".SVG":
                 exporter = exporters.SVGExporter(self.graphWidget.plotItem)
                 exporter.export(fname[0])
-            if extension.upper() == ".CSV":
-                exporter = exporters.CSVExporter(self.graphWidget.plotItem)
-                exporter.export(fname[0])
+            if extension.upper() == ".CSV" or extension.upper() == ".NPZ":
+                self.exportData(fname[0])
+
+    def exportData(self, filePath: str):
+        # Samples of all lines are written in the background, the dialog shows the progress
+        exportThread = GraphExportThread(filePath, self.graphLines, toWallClock(self.timestamp))
+        progressDialog = QProgressDialog("Exporting " + os.path.basename(filePath) + "...", "Cancel", 0, 100, self)
+        progressDialog.setWindowTitle("Export")
+        progressDialog.canceled.connect(exportThread.kill)
+        exportThread.signals.progress.connect(progressDialog.setValue)
+        exportThread.signals.finished.connect(progressDialog.close)
+        exportThread.signals.failed.connect(progressDialog.close)
+        exportThread.signals.failed.connect(print)
+        progressDialog.show()
+        # Keep the dialog (and the signals connected to it) alive until the export ends
+        self.exportProgressDialog = progressDialog
+        QThreadPool.globalInstance().start(exportThread)
 
     def openOptionsWindow(self):
         self.optionsWindow = GraphOptionsWindow()
@@ -622,38 +806,8 @@ class Graph(Tab):
         button.setStyleSheet("background-color : " + color)
 
     def setPlotUpdateTimer(self):
-        if self.plotUpdateString == "On input":
-            self.plotUpdatetimer.stop()
-        elif self.plotUpdateString == "30ms":
-            self.plotUpdatetimer.start(30)
-        elif self.plotUpdateString == "50ms":
-            self.plotUpdatetimer.start(50)
-        elif self.plotUpdateString == "100ms":
-            self.plotUpdatetimer.start(100)
-        elif self.plotUpdateString == "200ms":
-            self.plotUpdatetimer.start(200)
-        elif self.plotUpdateString == "500ms":
-            self.plotUpdatetimer.start(500)
-        elif self.plotUpdateString == "1s":
-            self.plotUpdatetimer.start(1000)
-        elif self.plotUpdateString == "2s":
-            self.plotUpdatetimer.start(2000)
-        elif self.plotUpdateString == "5s":
-            self.plotUpdatetimer.start(5000)
-        elif self.plotUpdateString == "10s":
-            self.plotUpdatetimer.start(10000)
-        elif self.plotUpdateString == "20s":
-            self.plotUpdatetimer.start(20000)
-        elif self.plotUpdateString == "30s":
-            self.plotUpdatetimer.start(30000)
-        elif self.plotUpdateString == "1m":
-            self.plotUpdatetimer.start(60000)
-        elif self.plotUpdateString == "2m":
-            self.plotUpdatetimer.start(120000)
-        elif self.plotUpdateString == "5m":
-            self.plotUpdatetimer.start(300000)
-        elif self.plotUpdateString == "10m":
-            self.plotUpdatetimer.start(600000)
+        # "On input" redraws are requested by receiveData, the other settings redraw periodically
+        RenderClock.instance().setInterval(self, PLOT_UPDATE_INTERVALS.get(self.plotUpdateString))
 
     def extractParametersFromOptionsWindow(self, window: GraphOptionsWindow):
         self.title = window.graphTitleLineEdit.text()
@@ -710,20 +864,18 @@ class Graph(Tab):
                     else:
                         if isInt(maxValue):
                             line.maxValueCount = returnInt(maxValue)
+        self.indexGraphLines()
 
         for line in self.graphLines:
             if not line.visible:
                 line.dataLine.clear()
-                line.x.clear()
-                line.x_time.clear()
-                line.x_index.clear()
-                line.y.clear()
+                line.clear()
 
         self.setPlotUpdateTimer()
         self.setTitle()
         self.setLabel()
 
-        self.plotGraph()
+        self.plotGraph(True)
 
     def extractParametersAndClose(self, window: GraphOptionsWindow):
         self.extractParametersFromOptionsWindow(window)
@@ -736,6 +888,10 @@ class Graph(Tab):
     def clearTable(self):
         for rowIndex in range(self.table.rowCount(), 0, -1):
             self.deleteLastRow()
+        self.invalidateWUSelection()
+
+    def invalidateWUSelection(self):
+        self.wuSelections.clear()
 
     def receiveData(self, obj: SerialParameters, data):
         if self.portCombobox.currentText() != obj.port and self.portCombobox.currentText() != "COM-ALL":
@@ -768,9 +924,10 @@ class Graph(Tab):
             self.dataFindByBytey(data, 10)
 
         if self.plotUpdateString == "On input":
-            self.plotGraph()
+            RenderClock.instance().requestRedraw(self)
 
     def dataFindAutomaitc(self, obj: SerialParameters, data):
+        timestamp = timestampOf(data)
         if obj.readTextIndex == "read_WU_device":
             numberValues = []
             numberNames = []
@@ -781,60 +938,38 @@ class Graph(Tab):
                     self.splitter1H.widget(1).show()
                     self.wuLayoutshow = True
 
-                checkedCBNames = self.checkWUForNewVars(len(data), obj.port)
+                selection = self.checkWUForNewVars(len(data), obj.port)
 
-                self.receivedValueData = []
-                for numberIndex in range(0, len(data)):
-                    self.receivedValueData.append(int(data[numberIndex], 16))
+                self.receivedValueData = data.values.tolist()
 
                 self.receivedCalValueData = []
                 if self.calibration.configured:
-                    self.receivedCalValueData = self.calibration.calibrate(self.receivedValueData)
+                    self.receivedCalValueData = self.calibration.calibrateFrame(obj.port, data)
 
-                for numberIndex in range(0, len(checkedCBNames)):
-                    numberNames.append(checkedCBNames[numberIndex][0])
-                    if self.shownType == "cal. Values" and self.calibration.configured:
-                        numberValues.append(self.receivedCalValueData[checkedCBNames[numberIndex][1]])
-                    else:
-                        numberValues.append(self.receivedValueData[checkedCBNames[numberIndex][1]])
+                numberNames = selection.names
+                if self.shownType == "cal. Values" and self.calibration.configured:
+                    numberValues = self.receivedCalValueData[selection.indices].tolist()
+                else:
+                    numberValues = data.values[selection.indices].tolist()
         else:
             try:
                 rawData = data.decode('utf-8')
             except:
                 rawData = str(int.from_bytes(data, "little"))
 
-            splittedData = (rawData.replace(":", " ")
-                            .replace(";", " ").replace("|", " ").replace(":", " ").replace("(", " ").replace(")", " ")
-                            .replace("[", " ").replace("]", " ").replace("{", " ").replace("}", " ").replace("?", " ")
-                            .replace("!", " ").replace("#", " ").replace("\"", " ").replace(",", ".").split())
-
-            numberValues = []
-            numberNames = []
-
-            for numberIndex in range(0, len(splittedData)):
-                if isFloat(splittedData[numberIndex]):
-                    numberName = " "
-                    for a in range(numberIndex - 1, -1, -1):
-                        if splittedData[a].strip() == "":
-                            break
-                        if isFloat(splittedData[a]):
-                            break
-                        numberName = splittedData[a]
-                        break
-                    if not self.useDruckbox2Bool or numberName in ["PIN", "PVBIN", "PVBOUT", "PSET"]:
-                        numberValues.append(returnFloat(splittedData[numberIndex]))
-                        numberNames.append(numberName)
+            numberNames, numberValues = self.lineTokenizer.tokenize(rawData)
+            if self.useDruckbox2Bool:
+                found = [(name, value) for name, value in zip(numberNames, numberValues)
+                         if name in ["PIN", "PVBIN", "PVBOUT", "PSET"]]
+                numberNames = [name for name, value in found]
+                numberValues = [value for name, value in found]
 
         for count in range(0, len(numberValues)):
             if numberNames[count].strip() != "":
-                if not any(x.name == numberNames[count] for x in self.graphLines):
-                    self.createGraphLine(numberNames[count])
-                    self.graphLines[-1].appendDataPoint(numberValues[count])
-                for line in self.graphLines:
-                    if line.name == numberNames[count]:
-                        line.appendDataPoint(numberValues[count])
+                self.graphLineByName(numberNames[count]).appendDataPoint(numberValues[count], timestamp=timestamp)
 
     def dataFindByBytey(self, data, byteCount: int):
+        timestamp = timestampOf(data)
         splittedData = [data[i:i + byteCount] for i in range(0, len(data), byteCount)]
         for count in range(0, len(splittedData)):
             try:
@@ -843,14 +978,19 @@ class Graph(Tab):
                 rawData = str(int.from_bytes(splittedData[count], "little"))
             if not isFloat(rawData):
                 continue
-            if not any(x.name == str(count) for x in self.graphLines):
-                self.createGraphLine(str(count))
-                self.graphLines[-1].appendDataPoint(returnFloat(rawData))
-            for line in self.graphLines:
-                if line.name == str(count):
-                    line.appendDataPoint(returnFloat(rawData))
+            self.graphLineByName(str(count)).appendDataPoint(returnFloat(rawData), timestamp=timestamp)
 
     def checkWUForNewVars(self, dataCounter, port: str):
+        # Frames of several Kennbins or ports may alternate, each keeps its own selection
+        calibrationKey = (self.calibration.configured, self.calibration.fileKey)
+        if calibrationKey != self.wuSelectionCalibration:
+            self.wuSelections.clear()
+            self.wuSelectionCalibration = calibrationKey
+        key = (port, dataCounter)
+        selection = self.wuSelections.get(key)
+        if selection is not None:
+            return selection
+
         returnData = []
         checkedtableCBNames = []
         tableCBNames = []
@@ -869,11 +1009,15 @@ class Graph(Tab):
                 returnData.append([channelName, numberIndex])
             if not channelName in tableCBNames:
                 QCB = QCheckBox(channelName)
+                QCB.toggled.connect(self.invalidateWUSelection)
                 self.table.insertRow(self.table.rowCount())
                 self.table.setCellWidget(self.table.rowCount() - 1, 0, QCB)
         self.table.setColumnWidth(0, self.table.width())
 
-        return returnData
+        selection = WUChannelSelection(key, [name for name, index in returnData],
+                                       [index for name, index in returnData])
+        self.wuSelections[key] = selection
+        return selection
 
     def calibrationButtonPressed(self):
         fileName = QFileDialog.getOpenFileName(None, "Open Calibration File", os.getcwd(), "csv(*.csv)\nall(*.*)", "",
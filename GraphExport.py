@@ -0,0 +1,138 @@
+import io
+import os
+import zipfile
+
+import numpy as np
+from PyQt5.QtCore import *
+
+# Rows (CSV) or samples (npz) written per step, progress is reported after every chunk
+CHUNK_SIZE = 65536
+
+
+class GraphExportSignals(QObject):
+    progress = pyqtSignal(int)  # percent
+    finished = pyqtSignal(str)  # file path
+    failed = pyqtSignal(str)  # error message
+
+
+class ExportLine:
+    # Snapshot of a GraphLine taken in the GUI thread: a copy of the samples in memory and the range of its
+    # history, which is read in the background
+    def __init__(self, line):
+        self.name = line.name
+        self.history = line.history
+        self.historyColumns = (line.X_TIME, line.X_INDEX, line.Y)
+        self.historyStart = line.firstIndex()
+        self.historyEnd = line.memoryFirstIndex()
+        self.time = line.x_time.copy()
+        self.index = line.x_index.copy()
+        self.value = line.y.copy()
+
+    def __len__(self):
+        return self.historyEnd - self.historyStart + len(self.value)
+
+    def columns(self, start: int, end: int):
+        # time, index and value of the samples [start, end) (counted from the line's first stored sample)
+        historyCount = self.historyEnd - self.historyStart
+        parts = []
+        if start < historyCount:
+            samples = self.history.read(self.historyStart + start, self.historyStart + min(end, historyCount))
+            parts.append((samples[self.historyColumns[0]], samples[self.historyColumns[1]],
+                          samples[self.historyColumns[2]]))
+        if end > historyCount:
+            memoryStart = max(0, start - historyCount)
+            memoryEnd = end - historyCount
+            parts.append((self.time[memoryStart:memoryEnd], self.index[memoryStart:memoryEnd],
+                          self.value[memoryStart:memoryEnd]))
+        if len(parts) == 1:
+            return parts[0]
+        return tuple(np.concatenate(column) for column in zip(*parts))
+
+
+class GraphExportThread(QRunnable):
+    # Writes the samples of graph lines (time, index and value of each line) to .csv or .npz in the background.
+    # CSV has three columns per line, shorter lines leave their cells empty. The .npz file holds the arrays
+    # "<name>/time", "<name>/index" and "<name>/value" per line and "startTime", the wall clock time of time 0.
+    def __init__(self, filePath: str, graphLines: list, startTime: float):
+        super().__init__()
+        self.filePath = filePath
+        self.startTime = startTime
+        self.lines = [ExportLine(line) for line in graphLines]
+        self.signals = GraphExportSignals()
+        self.is_killed = False
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            if os.path.splitext(self.filePath)[1].upper() == ".NPZ":
+                self.writeNpz()
+            else:
+                self.writeCsv()
+        except Exception as e:
+            self.removeFile()
+            self.signals.failed.emit("Exporting " + self.filePath + " failed: " + str(e))
+            return
+        if self.is_killed:
+            self.removeFile()
+            self.signals.failed.emit("Export of " + self.filePath + " cancelled")
+            return
+        self.signals.finished.emit(self.filePath)
+
+    def kill(self):
+        self.is_killed = True
+
+    def removeFile(self):
+        try:
+            os.remove(self.filePath)
+        except OSError:
+            pass
+
+    def reportProgress(self, done: int, total: int):
+        self.signals.progress.emit(int(100 * done / total) if total > 0 else 100)
+
+    def writeCsv(self):
+        rowCount = max([len(line) for line in self.lines], default=0)
+        header = ",".join(line.name + " " + column for line in self.lines
+                          for column in ("time [s]", "index", "value"))
+        with open(self.filePath, 'w', newline='') as file:
+            file.write(header + "\n")
+            for start in range(0, rowCount, CHUNK_SIZE):
+                if self.is_killed:
+                    return
+                end = min(rowCount, start + CHUNK_SIZE)
+                rows = np.full((end - start, 3 * len(self.lines)), np.nan)
+                for number, line in enumerate(self.lines):
+                    if start < len(line):
+                        columns = line.columns(start, min(end, len(line)))
+                        for offset, column in enumerate(columns):
+                            rows[:len(column), 3 * number + offset] = column
+                text = io.StringIO()
+                np.savetxt(text, rows, fmt="%.10g", delimiter=",")
+                # Rows of lines that have no more samples stay empty
+                file.write(text.getvalue().replace("nan", ""))
+                self.reportProgress(end, rowCount)
+
+    def writeNpz(self):
+        total = sum(3 * len(line) for line in self.lines)
+        done = 0
+        with zipfile.ZipFile(self.filePath, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+            with archive.open("startTime.npy", 'w') as member:
+                np.lib.format.write_array(member, np.array(self.startTime))
+            names = set()
+            for line in self.lines:
+                name = line.name
+                while name in names:
+                    name += "_"
+                names.add(name)
+                for offset, (column, dtype) in enumerate((("time", '<f8'), ("index", '<i8'), ("value", '<f8'))):
+                    with archive.open(name + "/" + column + ".npy", 'w', force_zip64=True) as member:
+                        np.lib.format.write_array_header_2_0(member, {'descr': dtype, 'fortran_order': False,
+                                                                      'shape': (len(line),)})
+                        for start in range(0, len(line), CHUNK_SIZE):
+                            if self.is_killed:
+                                return
+                            end = min(len(line), start + CHUNK_SIZE)
+                            member.write(line.columns(start, end)[offset].astype(dtype).tobytes())
+                            done += end - start
+                            self.reportProgress(done, total)
+        self.reportProgress(total, total)
@@ -0,0 +1,138 @@
+import mmap
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+# Samples per spilled segment
+SEGMENT_SIZE = 65536
+# Decompressed segments kept in memory for panning and zooming in the past
+CACHED_SEGMENTS = 4
+
+
+def packSegment(samples):
+    # samples: (columns, SEGMENT_SIZE) float64. The bytes of the floats are grouped by significance before
+    # compressing, neighbouring samples share their high bytes, which compresses much better.
+    columns = samples.shape[0]
+    planes = np.ascontiguousarray(samples, dtype=np.float64).view(np.uint8).reshape(columns, -1, 8)
+    return zlib.compress(planes.transpose(0, 2, 1).tobytes(), 1)
+
+
+def unpackSegment(packed: bytes, columns: int):
+    planes = np.frombuffer(zlib.decompress(packed), np.uint8).reshape(columns, 8, -1)
+    return np.ascontiguousarray(planes.transpose(0, 2, 1)).view(np.float64).reshape(columns, -1)
+
+
+class GraphHistory:
+    # Older samples of a GraphLine that were moved out of memory: compressed segments of SEGMENT_SIZE samples
+    # in a temporary file, read back through a memory map when the user looks at the past. Samples are
+    # addressed by their absolute index like in GraphLine, the history holds [startIndex, endIndex).
+    # Reading is thread safe (exports read in the background while the GUI thread appends).
+    def __init__(self, columns: int, searchColumns: tuple = ()):
+        self.columns = columns
+        # Ascending columns the history can be searched in (the last value of each segment is kept)
+        self.searchColumns = searchColumns
+        self.file = None
+        self.map = None
+        self.fileSize = 0
+        self.offsets = []
+        self.sizes = []
+        self.lastValues = {column: [] for column in searchColumns}
+        self.cache = OrderedDict()
+        self.startIndex = 0
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.offsets) * SEGMENT_SIZE
+
+    @property
+    def endIndex(self):
+        return self.startIndex + len(self)
+
+    def clear(self):
+        with self.lock:
+            if self.map is not None:
+                self.map.close()
+            if self.file is not None:
+                self.file.close()
+            self.__init__(self.columns, self.searchColumns)
+
+    def spill(self, samples, firstIndex: int):
+        # Appends one segment, samples: (columns, SEGMENT_SIZE) with samples[:, 0] at firstIndex
+        packed = packSegment(samples)
+        with self.lock:
+            if not self.offsets:
+                self.startIndex = firstIndex
+            if self.file is None:
+                self.file = tempfile.TemporaryFile(prefix="graph_history_")
+            self.file.seek(self.fileSize)
+            self.file.write(packed)
+            self.offsets.append(self.fileSize)
+            self.sizes.append(len(packed))
+            self.fileSize += len(packed)
+            for column in self.searchColumns:
+                self.lastValues[column].append(samples[column, -1])
+
+    def segment(self, number: int):
+        # Decompressed samples of a segment, (columns, SEGMENT_SIZE), paged in on demand
+        with self.lock:
+            samples = self.cache.get(number)
+            if samples is not None:
+                self.cache.move_to_end(number)
+                return samples
+            if self.map is None or len(self.map) < self.fileSize:
+                if self.map is not None:
+                    self.map.close()
+                self.file.flush()
+                self.map = mmap.mmap(self.file.fileno(), self.fileSize, access=mmap.ACCESS_READ)
+            offset = self.offsets[number]
+            packed = self.map[offset:offset + self.sizes[number]]
+            file = self.file
+        samples = unpackSegment(packed, self.columns)
+        samples.flags.writeable = False
+        with self.lock:
+            if file is not self.file:
+                # Cleared meanwhile, the segment is gone
+                return samples
+            self.cache[number] = samples
+            while len(self.cache) > CACHED_SEGMENTS:
+                self.cache.popitem(last=False)
+        return samples
+
+    def read(self, start: int, end: int):
+        # Samples [start, end) as (columns, end - start) array
+        parts = []
+        position = max(start, self.startIndex)
+        end = min(end, self.endIndex)
+        while position < end:
+            number = (position - self.startIndex) // SEGMENT_SIZE
+            segmentStart = self.startIndex + number * SEGMENT_SIZE
+            parts.append(self.segment(number)[:, position - segmentStart:min(end, segmentStart + SEGMENT_SIZE)
+                                                                        - segmentStart])
+            position = segmentStart + SEGMENT_SIZE
+        if not parts:
+            return np.zeros((self.columns, 0))
+        return np.concatenate(parts, axis=1)
+
+    def take(self, indices):
+        # Samples at the ascending absolute indices as (columns, len(indices)) array
+        result = np.zeros((self.columns, len(indices)))
+        numbers = (indices - self.startIndex) // SEGMENT_SIZE
+        bounds = np.flatnonzero(np.diff(numbers)) + 1
+        for first, last in zip(np.r_[0, bounds], np.r_[bounds, len(indices)]):
+            if last <= first:
+                continue
+            number = int(numbers[first])
+            result[:, first:last] = self.segment(number)[:, indices[first:last] - self.startIndex -
+                                                         number * SEGMENT_SIZE]
+        return result
+
+    def searchsorted(self, column: int, value: float, side: str = 'left'):
+        # Like np.searchsorted on the whole history of an ascending column, as absolute index
+        number = int(np.searchsorted(self.lastValues[column], value, side))
+        if number >= len(self.offsets):
+            return self.endIndex
+        position = int(np.searchsorted(self.segment(number)[column], value, side))
+        return self.startIndex + number * SEGMENT_SIZE + position
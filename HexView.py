@@ -0,0 +1,274 @@
+from PyQt5.QtGui import *
+from PyQt5.QtWidgets import *
+from PyQt5.QtCore import *
+
+BYTES_PER_ROW = 16
+# Received bytes kept for the hex view by default
+DEFAULT_BYTE_CAPACITY = 16 * 1024 * 1024
+# Share of the capacity dropped at once when it is exceeded, so the buffer is not moved for every chunk
+DROP_FRACTION = 8
+# Printable ASCII as is, everything else as "."
+ASCII_TABLE = bytes(byte if 0x20 <= byte < 0x7f else ord('.') for byte in range(256))
+
+
+class HexBuffer:
+    # Received bytes addressed by their offset since the last clear, holds [startOffset, endOffset). When more
+    # than capacity bytes are stored the oldest are dropped in whole rows, so startOffset stays row aligned.
+    def __init__(self, capacity: int = DEFAULT_BYTE_CAPACITY):
+        self.capacity = capacity
+        self.data = bytearray()
+        self.startOffset = 0
+        # Counts clears, views holding offsets notice that they became invalid
+        self.generation = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def endOffset(self):
+        return self.startOffset + len(self.data)
+
+    def append(self, chunk: bytes):
+        self.data += chunk
+        if len(self.data) > self.capacity:
+            drop = len(self.data) - self.capacity + self.capacity // DROP_FRACTION
+            drop = -(-drop // BYTES_PER_ROW) * BYTES_PER_ROW
+            del self.data[:drop]
+            self.startOffset += drop
+
+    def clear(self):
+        self.data = bytearray()
+        self.startOffset = 0
+        self.generation += 1
+
+    def read(self, offset: int, count: int):
+        # Bytes [offset, offset + count) that are still stored
+        start = max(0, offset - self.startOffset)
+        end = max(start, offset + count - self.startOffset)
+        return bytes(self.data[start:end])
+
+    def find(self, pattern: bytes, offset: int, backwards: bool = False):
+        # Offset of the first match at or after offset, or of the last match starting before offset. -1: none
+        position = max(0, offset - self.startOffset)
+        if backwards:
+            found = self.data.rfind(pattern, 0, position + len(pattern) - 1)
+        else:
+            found = self.data.find(pattern, position)
+        return found + self.startOffset if found >= 0 else -1
+
+
+class HexModel(QAbstractTableModel):
+    # One row per BYTES_PER_ROW bytes of a HexBuffer: offset, hex dump and ASCII. Rows are only formatted when
+    # the view paints them. The model follows the buffer in sync(), between two syncs it keeps its rows
+    # (rows dropped from the buffer meanwhile are shown empty).
+    OFFSET, HEX, TEXT = range(3)
+    headers = ["Offset", "Hex", "ASCII"]
+
+    def __init__(self, buffer: HexBuffer, parent=None):
+        super().__init__(parent)
+        self.buffer = buffer
+        self.generation = buffer.generation
+        self.startOffset = buffer.startOffset
+        self.endOffset = buffer.startOffset
+        self.rows = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        offset = self.rowOffset(index.row())
+        if index.column() == self.OFFSET:
+            return "%08X" % offset
+        row = self.buffer.read(offset, min(BYTES_PER_ROW, self.endOffset - offset))
+        if index.column() == self.HEX:
+            return row.hex(' ').upper()
+        return row.translate(ASCII_TABLE).decode('ascii')
+
+    def rowOffset(self, row: int):
+        return self.startOffset + row * BYTES_PER_ROW
+
+    def rowOf(self, offset: int):
+        return (offset - self.startOffset) // BYTES_PER_ROW
+
+    def sync(self):
+        # Removes the rows the buffer dropped and adds the new ones
+        buffer = self.buffer
+        if buffer.generation != self.generation:
+            self.beginResetModel()
+            self.generation = buffer.generation
+            self.startOffset = self.endOffset = buffer.startOffset
+            self.rows = 0
+            self.endResetModel()
+        dropped = (buffer.startOffset - self.startOffset) // BYTES_PER_ROW
+        if dropped > 0:
+            dropped = min(dropped, self.rows)
+            self.beginRemoveRows(QModelIndex(), 0, dropped - 1)
+            self.rows -= dropped
+            self.startOffset = buffer.startOffset
+            self.endOffset = max(self.endOffset, self.startOffset)
+            self.endRemoveRows()
+        if buffer.endOffset == self.endOffset:
+            return
+        if self.endOffset % BYTES_PER_ROW and self.rows > 0:
+            # The last row was incomplete and gets more bytes
+            self.endOffset = buffer.endOffset
+            self.dataChanged.emit(self.index(self.rows - 1, self.HEX), self.index(self.rows - 1, self.TEXT))
+        self.endOffset = buffer.endOffset
+        rows = -(-(self.endOffset - self.startOffset) // BYTES_PER_ROW)
+        if rows > self.rows:
+            self.beginInsertRows(QModelIndex(), self.rows, rows - 1)
+            self.rows = rows
+            self.endInsertRows()
+
+
+class HexView(QWidget):
+    # Hex dump of the received bytes with search and go to offset. The table only formats the visible rows and
+    # all rows have the same height, so millions of bytes scroll as fast as a few.
+    def __init__(self, capacity: int = DEFAULT_BYTE_CAPACITY, parent=None):
+        super().__init__(parent)
+        self.buffer = HexBuffer(capacity)
+        self.model = HexModel(self.buffer, self)
+        # Offset and length of the selected search result
+        self.matchOffset = None
+        self.matchLength = 0
+
+        font = QFontDatabase.systemFont(QFontDatabase.FixedFont)
+        metrics = QFontMetrics(font)
+        self.table = QTableView()
+        self.table.setFont(font)
+        self.table.setModel(self.model)
+        self.table.setShowGrid(False)
+        self.table.setWordWrap(False)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().hide()
+        # Fixed sizes, the headers never measure rows
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(metrics.height() + 2)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        padding = 4 * metrics.horizontalAdvance("0")
+        self.table.setColumnWidth(HexModel.OFFSET, metrics.horizontalAdvance("0" * 8) + padding)
+        self.table.setColumnWidth(HexModel.HEX, metrics.horizontalAdvance("0" * (3 * BYTES_PER_ROW - 1)) + padding)
+        self.table.horizontalHeader().setStretchLastSection(True)
+
+        self.searchLineEdit = QLineEdit()
+        self.searchLineEdit.setPlaceholderText("Search")
+        self.searchLineEdit.returnPressed.connect(self.findNext)
+        self.searchTypeCombobox = QComboBox()
+        self.searchTypeCombobox.addItems(["Hex", "Text"])
+        self.findPreviousButton = QPushButton("<")
+        self.findPreviousButton.setFixedWidth(30)
+        self.findPreviousButton.clicked.connect(self.findPrevious)
+        self.findNextButton = QPushButton(">")
+        self.findNextButton.setFixedWidth(30)
+        self.findNextButton.clicked.connect(self.findNext)
+        self.offsetLineEdit = QLineEdit()
+        self.offsetLineEdit.setPlaceholderText("Go to offset (hex)")
+        self.offsetLineEdit.setFixedWidth(130)
+        self.offsetLineEdit.returnPressed.connect(self.goToEnteredOffset)
+        self.statusLabel = QLabel()
+
+        searchLayout = QHBoxLayout()
+        searchLayout.setContentsMargins(0, 0, 0, 0)
+        searchLayout.addWidget(self.searchLineEdit)
+        searchLayout.addWidget(self.searchTypeCombobox)
+        searchLayout.addWidget(self.findPreviousButton)
+        searchLayout.addWidget(self.findNextButton)
+        searchLayout.addWidget(self.offsetLineEdit)
+        searchLayout.addWidget(self.statusLabel)
+
+        mainLayout = QVBoxLayout()
+        mainLayout.setContentsMargins(0, 0, 0, 0)
+        mainLayout.addWidget(self.table)
+        mainLayout.addLayout(searchLayout)
+        self.setLayout(mainLayout)
+
+    def append(self, data: bytes):
+        # Cheap, the table follows in sync()
+        self.buffer.append(data)
+
+    def sync(self, autoscroll: bool = False):
+        self.model.sync()
+        if autoscroll and self.isVisible():
+            self.table.scrollToBottom()
+
+    def clear(self):
+        self.buffer.clear()
+        self.model.sync()
+        self.matchOffset = None
+        self.statusLabel.setText("")
+
+    def searchPattern(self):
+        text = self.searchLineEdit.text()
+        if self.searchTypeCombobox.currentText() == "Text":
+            return text.encode('utf-8')
+        try:
+            return bytes.fromhex(text.replace("0x", "").replace(",", " "))
+        except ValueError:
+            self.statusLabel.setText("Invalid hex bytes")
+            return b""
+
+    def findNext(self):
+        self.find(False)
+
+    def findPrevious(self):
+        self.find(True)
+
+    def find(self, backwards: bool):
+        pattern = self.searchPattern()
+        if not pattern:
+            return
+        self.model.sync()
+        if self.matchOffset is None or self.matchOffset < self.buffer.startOffset:
+            offset = self.buffer.endOffset if backwards else self.buffer.startOffset
+        else:
+            offset = self.matchOffset if backwards else self.matchOffset + 1
+        found = self.buffer.find(pattern, offset, backwards)
+        wrapped = False
+        if found < 0:
+            # Continue at the other end
+            wrapped = True
+            found = self.buffer.find(pattern, self.buffer.endOffset if backwards else self.buffer.startOffset,
+                                     backwards)
+        if found < 0:
+            self.matchOffset = None
+            self.statusLabel.setText("Not found")
+            return
+        self.matchOffset = found
+        self.matchLength = len(pattern)
+        self.statusLabel.setText("Found at %X" % found + (" (wrapped)" if wrapped else ""))
+        self.showRange(found, len(pattern))
+
+    def goToEnteredOffset(self):
+        try:
+            offset = int(self.offsetLineEdit.text(), 16)
+        except ValueError:
+            self.statusLabel.setText("Invalid offset")
+            return
+        self.model.sync()
+        if not self.buffer.startOffset <= offset < max(self.buffer.endOffset, self.buffer.startOffset + 1):
+            self.statusLabel.setText("Stored: %X - %X" % (self.buffer.startOffset, max(0, self.buffer.endOffset - 1)))
+            return
+        self.statusLabel.setText("")
+        self.showRange(offset, 1)
+
+    def showRange(self, offset: int, length: int):
+        # Selects the rows of the bytes [offset, offset + length) and scrolls them into view
+        if self.model.rowCount() == 0:
+            return
+        firstRow = max(0, self.model.rowOf(offset))
+        lastRow = min(self.model.rowCount() - 1, self.model.rowOf(offset + length - 1))
+        selection = QItemSelection(self.model.index(firstRow, 0),
+                                   self.model.index(lastRow, self.model.columnCount() - 1))
+        self.table.selectionModel().select(selection, QItemSelectionModel.ClearAndSelect)
+        self.table.scrollTo(self.model.index(firstRow, 0), QAbstractItemView.PositionAtCenter)
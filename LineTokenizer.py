@@ -0,0 +1,68 @@
+import re
+from operator import itemgetter
+
+# Characters that separate names and values in text lines, "," is a decimal comma
+SEPARATOR_TABLE = str.maketrans({character: " " for character in ":;|()[]{}?!#\""} | {",": "."})
+
+# Tokens that float() accepts (incl. "1e-3", "+.5", "1_000", "nan", "inf")
+DIGITS = r"\d(?:_?\d)*"
+NUMBER_RE = re.compile(r"[+-]?(?:(?:" + DIGITS + r"(?:\.(?:" + DIGITS + r")?)?|\." + DIGITS + r")(?:[eE][+-]?" +
+                       DIGITS + r")?|(?i:inf(?:inity)?|nan))")
+
+# Layouts remembered per token count, the most recently used first
+MAX_LAYOUTS_PER_COUNT = 8
+
+
+def tupleGetter(positions: tuple):
+    # itemgetter that always returns a tuple
+    if len(positions) == 0:
+        return lambda tokens: ()
+    if len(positions) == 1:
+        position = positions[0]
+        return lambda tokens: (tokens[position],)
+    return itemgetter(*positions)
+
+
+class LineLayout:
+    # Which tokens of a line are numbers, the other tokens (names and text) and the name of each number
+    def __init__(self, tokens: list, isNumber: list):
+        numberPositions = tuple(position for position in range(len(tokens)) if isNumber[position])
+        textPositions = tuple(position for position in range(len(tokens)) if not isNumber[position])
+        self.getNumbers = tupleGetter(numberPositions)
+        self.getText = tupleGetter(textPositions)
+        self.text = self.getText(tokens)
+        # The name of a number is the token right before it, if that is no number
+        self.names = [tokens[position - 1] if position > 0 and not isNumber[position - 1] else " "
+                      for position in numberPositions]
+
+    def values(self, tokens: list):
+        # Values of the numbers if tokens have this layout, None otherwise
+        if self.getText(tokens) != self.text:
+            return None
+        try:
+            return list(map(float, self.getNumbers(tokens)))
+        except ValueError:
+            return None
+
+
+class LineTokenizer:
+    # Finds the numbers of a text line and their names. Lines of a layout seen before (same text tokens at the
+    # same positions) are not parsed again, their numbers are converted directly.
+    def __init__(self):
+        self.layouts = {}
+
+    def tokenize(self, line: str):
+        # Returns the names and values of all numbers in line. The names list is shared with the layout cache.
+        tokens = line.translate(SEPARATOR_TABLE).split()
+        layouts = self.layouts.setdefault(len(tokens), [])
+        for index, layout in enumerate(layouts):
+            values = layout.values(tokens)
+            if values is not None:
+                if index > 0:
+                    layouts.insert(0, layouts.pop(index))
+                return layout.names, values
+
+        layout = LineLayout(tokens, [NUMBER_RE.fullmatch(token) is not None for token in tokens])
+        layouts.insert(0, layout)
+        del layouts[MAX_LAYOUTS_PER_COUNT:]
+        return layout.names, list(map(float, layout.getNumbers(tokens)))
@@ -0,0 +1,150 @@
+import numpy as np
+
+from RingBuffer import RingBuffer
+
+
+class MinMaxPyramid:
+    # Level of detail cache for a plot line: level L holds, for every block of BLOCK_SIZE * 2^L samples, the
+    # sample indices of its minimum and maximum. Samples are addressed by their absolute index (GraphLine.x_index),
+    # block i of a level covers the samples [i * blockSize, (i + 1) * blockSize). The levels are extended as
+    # samples arrive and keep only the blocks of samples that are still in the line's buffer.
+    BLOCK_SIZE = 8
+    # Columns of the level buffers
+    MIN_INDEX = 0
+    MAX_INDEX = 1
+    MIN_Y = 2
+    MAX_Y = 3
+
+    def __init__(self, capacity: int = 0):
+        self.capacity = capacity
+        self.levels = []
+        self.blockCounts = []
+        self.firstIndex = 0
+
+    def blockSize(self, level: int):
+        return self.BLOCK_SIZE << level
+
+    def levelCapacity(self, level: int):
+        if self.capacity <= 0:
+            return 0
+        return self.capacity // self.blockSize(level) + 2
+
+    def addLevel(self):
+        level = len(self.levels)
+        self.levels.append(RingBuffer(self.levelCapacity(level), 4))
+        self.blockCounts.append(-(-self.firstIndex // self.blockSize(level)))
+
+    def clear(self):
+        self.levels = []
+        self.blockCounts = []
+        self.firstIndex = 0
+
+    def setCapacity(self, capacity: int):
+        self.capacity = capacity
+        for level, blocks in enumerate(self.levels):
+            blocks.setCapacity(self.levelCapacity(level))
+
+    def restart(self, firstIndex: int):
+        # Samples were dropped before they were added to the pyramid, start again behind them
+        self.clear()
+        self.firstIndex = firstIndex
+
+    def firstBlock(self, level: int):
+        return self.blockCounts[level] - len(self.levels[level])
+
+    def update(self, y, firstIndex: int):
+        # y: all samples in the buffer, y[0] having the absolute index firstIndex
+        if not self.levels:
+            self.firstIndex = firstIndex
+            self.addLevel()
+        start = self.blockCounts[0] * self.BLOCK_SIZE
+        if start < firstIndex:
+            self.restart(firstIndex)
+            self.addLevel()
+            start = self.blockCounts[0] * self.BLOCK_SIZE
+
+        endIndex = firstIndex + len(y)
+        newBlocks = (endIndex - start) // self.BLOCK_SIZE
+        if newBlocks <= 0:
+            return
+        samples = y[start - firstIndex:start - firstIndex + newBlocks * self.BLOCK_SIZE].reshape(newBlocks,
+                                                                                                  self.BLOCK_SIZE)
+        offsets = start + np.arange(newBlocks) * self.BLOCK_SIZE
+        minPos = np.argmin(samples, axis=1)
+        maxPos = np.argmax(samples, axis=1)
+        rows = np.arange(newBlocks)
+        self.appendBlocks(0, offsets + minPos, offsets + maxPos, samples[rows, minPos], samples[rows, maxPos])
+
+        level = 0
+        while True:
+            if level + 1 == len(self.levels):
+                if self.blockCounts[level] - self.firstBlock(level) < 2:
+                    break
+                self.addLevel()
+            children = self.levels[level].views()
+            childFirst = self.firstBlock(level)
+            parentStart = max(self.blockCounts[level + 1], -(-childFirst // 2))
+            parentEnd = self.blockCounts[level] // 2
+            if parentEnd <= parentStart:
+                self.blockCounts[level + 1] = max(self.blockCounts[level + 1], parentStart)
+                break
+            left = 2 * np.arange(parentStart, parentEnd) - childFirst
+            right = left + 1
+            leftMin = children[self.MIN_Y][left] <= children[self.MIN_Y][right]
+            leftMax = children[self.MAX_Y][left] >= children[self.MAX_Y][right]
+            self.blockCounts[level + 1] = parentStart
+            self.appendBlocks(level + 1,
+                              np.where(leftMin, children[self.MIN_INDEX][left], children[self.MIN_INDEX][right]),
+                              np.where(leftMax, children[self.MAX_INDEX][left], children[self.MAX_INDEX][right]),
+                              np.where(leftMin, children[self.MIN_Y][left], children[self.MIN_Y][right]),
+                              np.where(leftMax, children[self.MAX_Y][left], children[self.MAX_Y][right]))
+            level += 1
+
+    def dropFineBlocks(self, endIndex: int, levelCount: int):
+        # Frees the blocks of the finest levelCount levels for the samples before endIndex (e.g. samples that were
+        # moved to disk), except blocks not yet merged into the next level. There collect() uses the coarser
+        # levels or single samples instead.
+        for level in range(min(levelCount, len(self.levels) - 1)):
+            endBlock = min(endIndex // self.blockSize(level), 2 * self.blockCounts[level + 1])
+            self.levels[level].discard(endBlock - self.firstBlock(level))
+
+    def appendBlocks(self, level: int, minIndex, maxIndex, minY, maxY):
+        self.levels[level].extend(minIndex, maxIndex, minY, maxY)
+        self.blockCounts[level] += len(minIndex)
+
+    def collect(self, level: int, start: int, end: int, parts: list):
+        # Adds the sample indices that represent [start, end) to parts, using complete blocks of this level
+        # and finer levels (or single samples) for the rest
+        if end <= start:
+            return
+        if level < 0:
+            parts.append(np.arange(start, end))
+            return
+        blockSize = self.blockSize(level)
+        firstBlock = max(-(-start // blockSize), self.firstBlock(level))
+        endBlock = min(end // blockSize, self.blockCounts[level])
+        if endBlock <= firstBlock:
+            self.collect(level - 1, start, end, parts)
+            return
+        self.collect(level - 1, start, firstBlock * blockSize, parts)
+        blocks = self.levels[level]
+        first = firstBlock - self.firstBlock(level)
+        last = endBlock - self.firstBlock(level)
+        minIndex = blocks.view(self.MIN_INDEX)[first:last]
+        maxIndex = blocks.view(self.MAX_INDEX)[first:last]
+        parts.append(np.stack((np.minimum(minIndex, maxIndex), np.maximum(minIndex, maxIndex)), axis=1).ravel())
+        self.collect(level - 1, endBlock * blockSize, end, parts)
+
+    def decimate(self, start: int, end: int, pixelWidth: int):
+        # Sample indices (absolute, ascending) to draw [start, end) on pixelWidth pixels: the minimum and
+        # maximum of about one block per pixel, i.e. about 2 * pixelWidth points
+        sampleCount = end - start
+        pixelWidth = max(1, pixelWidth)
+        if sampleCount <= 2 * pixelWidth or not self.levels:
+            return None
+        level = 0
+        while level + 1 < len(self.levels) and self.blockSize(level) * pixelWidth < sampleCount:
+            level += 1
+        parts = []
+        self.collect(level, start, end, parts)
+        return np.concatenate(parts).astype(np.int64)
@@ -4,10 +4,13 @@ from PyQt5.QtWidgets import *
 from PyQt5.QtGui import *
 from PyQt5.QtCore import *
 
+from ReplaySource import isReplayPort
+
 
 class PortMenu(QMenu):
     connectActionTriggeredSignal = pyqtSignal(str)
     disconnectActionTriggeredSignal = pyqtSignal(str)
+    replayActionTriggeredSignal = pyqtSignal()
 
     def __init__(self, connectedPorts: list, parent=None):
         super(PortMenu, self).__init__(parent)
@@ -26,16 +29,38 @@ class PortMenu(QMenu):
 
         for port in serial.tools.list_ports.comports():
             action = QAction(port.name + " - " + port.description, self)
+            action.setData(port.name)
             action.setCheckable(True)
             if any(x.port == port.name for x in self.connectedPorts):
                 action.setChecked(True)
             self.addAction(action)
             action.triggered.connect(self.actionTriggeredEvent)
 
+        self.addSeparator()
+        act = QAction("Aufnahmen", self)
+        act.setEnabled(False)
+        act.setFont(font1)
+        self.addAction(act)
+
+        # Running replays are listed like ports, unchecking one stops it
+        for port in self.connectedPorts:
+            if isReplayPort(port.port):
+                action = QAction(port.port + " - " + port.replayFilePath, self)
+                action.setData(port.port)
+                action.setCheckable(True)
+                action.setChecked(True)
+                self.addAction(action)
+                action.triggered.connect(self.actionTriggeredEvent)
+
+        action = QAction("Replay recording...", self)
+        self.addAction(action)
+        action.triggered.connect(self.replayActionTriggeredSignal.emit)
+
     def actionTriggeredEvent(self):
+        # The port name is kept in the action's data, names of replayed files may contain " - "
         if self.sender().isChecked():
-            self.connectActionTriggeredSignal.emit(self.sender().text().split(" -")[0])
+            self.connectActionTriggeredSignal.emit(self.sender().data())
         else:
-            self.disconnectActionTriggeredSignal.emit(self.sender().text().split(" -")[0])
+            self.disconnectActionTriggeredSignal.emit(self.sender().data())
 
 
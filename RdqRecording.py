@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import struct
+import threading
+from time import time
+
+import numpy as np
+
+from RecordWriter import RecordWriter
+from WUFrame import WUFrame
+from CaptureClock import toWallClock
+
+# Layout of a .rdq file:
+#   HEADER_SIZE bytes header: b'RDQ1' | uint32 json length | json (utf-8) | zero padding
+#   fixed size records:       float64 timestamp (unix time, little endian) | n big endian uint16 words | uint8 crc ok
+# Every file only holds frames of a single Kennbin, so all records have the same size.
+RDQ_MAGIC = b'RDQ1'
+RDQ_VERSION = 1
+HEADER_SIZE = 4096
+
+
+def recordDtype(channelCount: int):
+    return np.dtype([('timestamp', '<f8'), ('values', '>u2', (channelCount,)), ('crcOk', 'u1')])
+
+
+def fileHash(filePath: str):
+    if not filePath or not os.path.isfile(filePath):
+        return ""
+    sha1 = hashlib.sha1()
+    with open(filePath, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+def unusedFilePath(filePath: str):
+    # filePath, or "<name>_<n><ext>" with the first n that does not exist yet
+    root, extension = os.path.splitext(filePath)
+    number = 0
+    while os.path.exists(filePath):
+        number += 1
+        filePath = root + "_" + str(number) + extension
+    return filePath
+
+
+def packHeader(header: dict):
+    headerText = json.dumps(header).encode('utf-8')
+    while len(headerText) + 8 > HEADER_SIZE and header.get("notes"):
+        header["notes"] = header["notes"][1:]
+        header["notesTruncated"] = True
+        headerText = json.dumps(header).encode('utf-8')
+    if len(headerText) + 8 > HEADER_SIZE:
+        raise ValueError("rdq header too large")
+    return (RDQ_MAGIC + struct.pack('<I', len(headerText)) + headerText).ljust(HEADER_SIZE, b'\x00')
+
+
+def readHeader(filePath: str):
+    with open(filePath, 'rb') as file:
+        data = file.read(HEADER_SIZE)
+    if len(data) < 8 or data[:4] != RDQ_MAGIC:
+        raise ValueError(filePath + " is not a rdq file")
+    headerLength = struct.unpack('<I', data[4:8])[0]
+    return json.loads(data[8:8 + headerLength].decode('utf-8'))
+
+
+class RdqFile:
+    def __init__(self, filePath: str, header: dict):
+        self.filePath = filePath
+        self.header = header
+        self.recordSize = recordDtype(header["channels"]).itemsize
+        # 'xb': never truncates an existing recording
+        with open(filePath, 'xb') as file:
+            file.write(packHeader(header))
+        self.recordWriter = RecordWriter(filePath, binary=True)
+
+    def close(self):
+        self.recordWriter.close()
+        try:
+            with open(self.filePath, 'r+b') as file:
+                file.write(packHeader(self.header))
+                file.flush()
+                os.fsync(file.fileno())
+        except OSError as e:
+            print("Could not write rdq header of " + self.filePath + ": " + str(e))
+
+
+class RdqWriter:
+    # Writes WUFrames into .rdq files, one file per Kennbin. The first Kennbin uses filePath,
+    # every further Kennbin gets "_<Kennbin>" appended to the file name. Existing files are never overwritten,
+    # if a name is taken "_<n>" is appended (so restarting a recording under the same name adds a new file).
+    def __init__(self, filePath: str, port: str = "", baudrate: int = 0, calibrationFilePath: str = ""):
+        self.filePath = filePath
+        self.port = port
+        self.baudrate = baudrate
+        self.calibrationFilePath = calibrationFilePath
+        self.calibrationHash = fileHash(calibrationFilePath)
+        self.files = {}
+        self.notes = []
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def openFile(self, frame: WUFrame):
+        if self.files:
+            root, extension = os.path.splitext(self.filePath)
+            filePath = unusedFilePath(root + "_" + frame.Kennbin.hex() + extension)
+        else:
+            filePath = unusedFilePath(self.filePath)
+            if filePath != self.filePath:
+                print(self.filePath + " already exists, recording to " + filePath)
+                self.filePath = filePath
+        header = {"version": RDQ_VERSION,
+                  "port": self.port,
+                  "baudrate": self.baudrate,
+                  "Kennbin": frame.Kennbin.hex(),
+                  "channels": len(frame),
+                  "calibrationFile": self.calibrationFilePath,
+                  "calibrationHash": self.calibrationHash,
+                  "startTime": time(),
+                  "stopTime": None,
+                  "frameCount": 0,
+                  "crcErrors": 0,
+                  "notes": []}
+        rdqFile = RdqFile(filePath, header)
+        self.files[frame.Kennbin] = rdqFile
+        return rdqFile
+
+    def writeFrame(self, frame: WUFrame):
+        with self.lock:
+            if self.closed:
+                return False
+            rdqFile = self.files.get(frame.Kennbin)
+            if rdqFile is None:
+                rdqFile = self.openFile(frame)
+            if len(frame) != rdqFile.header["channels"]:
+                return False
+            # Written under the lock (RecordWriter.write only queues), so close() can't come in between and the
+            # header counts exactly the frames that were written
+            if not rdqFile.recordWriter.write(struct.pack('<d', toWallClock(frame.timestamp)) + frame.raw +
+                                              (b'\x01' if frame.crcOk else b'\x00')):
+                return False
+            rdqFile.header["frameCount"] += 1
+            if not frame.crcOk:
+                rdqFile.header["crcErrors"] += 1
+        return True
+
+    def write(self, text: str):
+        # Free text (e.g. measurement markers) is kept as timestamped notes in the header
+        with self.lock:
+            if self.closed:
+                return False
+            self.notes.append([time(), text])
+        return True
+
+    def sync(self):
+        with self.lock:
+            rdqFiles = list(self.files.values())
+        for rdqFile in rdqFiles:
+            rdqFile.recordWriter.sync()
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+        for rdqFile in self.files.values():
+            rdqFile.header["stopTime"] = time()
+            rdqFile.header["notes"] = self.notes
+            rdqFile.close()
+
+
+class RdqReader:
+    # Memory maps a .rdq file as a NumPy structured array with the fields timestamp, values and crcOk
+    def __init__(self, filePath: str):
+        self.filePath = filePath
+        self.header = readHeader(filePath)
+        self.dtype = recordDtype(self.header["channels"])
+        recordCount = (os.path.getsize(filePath) - HEADER_SIZE) // self.dtype.itemsize
+        if recordCount > 0:
+            self.records = np.memmap(filePath, dtype=self.dtype, mode='r', offset=HEADER_SIZE,
+                                     shape=(recordCount,))
+        else:
+            self.records = np.zeros(0, dtype=self.dtype)
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def timestamps(self):
+        return self.records['timestamp']
+
+    @property
+    def values(self):
+        return self.records['values']
+
+    @property
+    def crcOk(self):
+        # Converts the whole column, slice records['crcOk'] first for parts of large files
+        return self.records['crcOk'].astype(bool)
+
+    @property
+    def Kennbin(self):
+        return bytes.fromhex(self.header["Kennbin"])
@@ -0,0 +1,118 @@
+import os
+import threading
+from time import monotonic
+
+
+class RecordWriter:
+    # Keeps a record file open and writes buffered data from a background thread.
+    # Data is flushed as soon as flushSize bytes are pending or flushInterval seconds passed,
+    # the file is fsynced every fsyncInterval seconds and on sync()/close().
+    # A failed write (e.g. disk full, network share gone) stops the writer: the error is printed and kept in
+    # self.error, pending data is dropped and write() returns False from then on.
+    def __init__(self, filePath: str, binary: bool = False, flushSize: int = 64 * 1024,
+                 flushInterval: float = 0.5, fsyncInterval: float = 5.0):
+        self.filePath = filePath
+        self.binary = binary
+        self.flushSize = flushSize
+        self.flushInterval = flushInterval
+        self.fsyncInterval = fsyncInterval
+
+        if binary:
+            self.file = open(filePath, 'ab')
+        else:
+            self.file = open(filePath, 'a')
+
+        self.pending = []
+        self.pendingSize = 0
+        self.closed = False
+        self.error = None
+        self.lastSyncTime = monotonic()
+        self.writtenBytes = 0
+
+        self.condition = threading.Condition()
+        self.fileLock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name="RecordWriter " + os.path.basename(filePath),
+                                       daemon=True)
+        self.thread.start()
+
+    def write(self, data):
+        with self.condition:
+            if self.closed or self.error is not None:
+                return False
+            self.pending.append(data)
+            self.pendingSize += len(data)
+            if self.pendingSize >= self.flushSize:
+                self.condition.notify()
+        return True
+
+    def run(self):
+        while True:
+            with self.condition:
+                if not self.closed and self.pendingSize < self.flushSize:
+                    self.condition.wait(self.flushInterval)
+                if self.closed or self.error is not None:
+                    return
+            self.flush()
+            if monotonic() - self.lastSyncTime >= self.fsyncInterval:
+                self.sync()
+
+    def takePending(self):
+        with self.condition:
+            pending = self.pending
+            self.pending = []
+            self.pendingSize = 0
+        if self.binary:
+            return b''.join(pending)
+        return ''.join(pending)
+
+    def flush(self):
+        with self.fileLock:
+            if self.file.closed:
+                return
+            data = self.takePending()
+            if self.error is not None:
+                return
+            try:
+                if data:
+                    self.file.write(data)
+                    self.writtenBytes += len(data)
+                self.file.flush()
+            except OSError as e:
+                self.fail(e)
+
+    def fail(self, error: OSError):
+        with self.condition:
+            self.error = error
+            self.pending = []
+            self.pendingSize = 0
+        print("Could not write record file " + self.filePath + ": " + str(error))
+
+    def sync(self):
+        self.flush()
+        with self.fileLock:
+            if self.file.closed:
+                return
+            try:
+                os.fsync(self.file.fileno())
+            except OSError as e:
+                print("Could not sync record file: " + str(e))
+            self.lastSyncTime = monotonic()
+
+    def close(self):
+        with self.condition:
+            if self.closed:
+                return
+            self.closed = True
+            self.condition.notify()
+        if self.thread is not threading.current_thread():
+            self.thread.join()
+        try:
+            self.sync()
+        finally:
+            with self.fileLock:
+                try:
+                    self.file.close()
+                except OSError as e:
+                    # Data still buffered in the file object could not be written
+                    if self.error is None:
+                        self.fail(e)
@@ -0,0 +1,148 @@
+from time import perf_counter
+
+from PyQt5 import sip
+from PyQt5.QtCore import QObject, QTimer
+from PyQt5.QtWidgets import QApplication
+
+# Share of the GUI thread's time redraws may take, the clock slows down if they take longer
+RENDER_BUDGET = 0.5
+# Slowest the clock gets when rendering is expensive (s)
+MAX_TICK_PERIOD = 0.5
+# Weight of a new measurement in the moving averages
+SMOOTHING = 0.1
+
+
+class FrameStats:
+    # Render times of one tab (s)
+    def __init__(self):
+        self.count = 0
+        self.last = 0.0
+        self.average = 0.0
+        self.maximum = 0.0
+
+    def add(self, duration: float):
+        self.count += 1
+        self.last = duration
+        self.average = duration if self.count == 1 else self.average + SMOOTHING * (duration - self.average)
+        self.maximum = max(self.maximum, duration)
+
+    def __str__(self):
+        return "%.1f ms avg, %.1f ms max, %d frames" % (self.average * 1e3, self.maximum * 1e3, self.count)
+
+
+class Subscription:
+    def __init__(self, tab):
+        self.tab = tab
+        # Seconds between redraws, None: only redraw on request (e.g. "On input")
+        self.interval = None
+        self.nextTime = 0.0
+        self.requested = False
+        self.stats = FrameStats()
+
+
+class RenderClock(QObject):
+    # One clock for the redraws of all Graph tabs: tabs due at the same tick are drawn together, so ten graphs
+    # cause one wake-up instead of ten. The tick period follows the display refresh rate and grows when
+    # redraws take more than RENDER_BUDGET of the time. Tabs register with a redraw interval and/or request
+    # redraws, the clock calls their plotGraph() and keeps FrameStats per tab.
+    clock = None
+
+    @classmethod
+    def instance(cls):
+        # Created on first use, a QApplication has to exist
+        if cls.clock is None:
+            cls.clock = RenderClock()
+        return cls.clock
+
+    def __init__(self):
+        super().__init__()
+        self.subscriptions = {}
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.tick)
+        self.lastTickTime = 0.0
+        self.tickCost = 0.0
+
+    def displayPeriod(self):
+        screen = QApplication.primaryScreen()
+        if screen is not None and screen.refreshRate() > 0:
+            return 1 / screen.refreshRate()
+        return 1 / 60
+
+    def tickPeriod(self):
+        # Not faster than the display, and slow enough to keep redraws within the budget
+        return min(MAX_TICK_PERIOD, max(self.displayPeriod(), self.tickCost / RENDER_BUDGET))
+
+    def subscription(self, tab):
+        subscription = self.subscriptions.get(tab)
+        if subscription is None:
+            subscription = Subscription(tab)
+            self.subscriptions[tab] = subscription
+            # Tabs closed with deleteLater() never get a closeEvent, they must not be kept alive by the clock
+            tab.destroyed.connect(lambda: self.unregister(tab))
+        return subscription
+
+    def setInterval(self, tab, interval: float = None):
+        # Redraw tab every interval seconds, None stops the periodic redraws
+        subscription = self.subscription(tab)
+        subscription.interval = interval
+        subscription.nextTime = perf_counter() + interval if interval is not None else 0.0
+        self.schedule()
+
+    def requestRedraw(self, tab):
+        # Redraw tab at the next tick, requests until then are merged
+        subscription = self.subscription(tab)
+        if not subscription.requested:
+            subscription.requested = True
+            self.schedule()
+
+    def unregister(self, tab):
+        self.subscriptions.pop(tab, None)
+
+    def frameStats(self, tab):
+        subscription = self.subscriptions.get(tab)
+        return subscription.stats if subscription is not None else None
+
+    def statistics(self):
+        # (tab, FrameStats) of all tabs, most expensive first
+        return sorted(((subscription.tab, subscription.stats) for subscription in self.subscriptions.values()),
+                      key=lambda item: item[1].average, reverse=True)
+
+    def schedule(self):
+        nextTimes = [subscription.nextTime for subscription in self.subscriptions.values()
+                     if subscription.interval is not None]
+        if any(subscription.requested for subscription in self.subscriptions.values()):
+            nextTimes.append(0.0)
+        if not nextTimes:
+            self.timer.stop()
+            return
+        tickTime = max(min(nextTimes), self.lastTickTime + self.tickPeriod())
+        delay = max(0, int((tickTime - perf_counter()) * 1000))
+        if self.timer.isActive() and self.timer.remainingTime() <= delay:
+            return
+        self.timer.start(delay)
+
+    def tick(self):
+        now = perf_counter()
+        self.lastTickTime = now
+        # Slack of half a tick, so intervals that are not a multiple of the tick period do not drift
+        slack = self.tickPeriod() / 2
+        for tab, subscription in list(self.subscriptions.items()):
+            due = subscription.interval is not None and now + slack >= subscription.nextTime
+            if not (due or subscription.requested):
+                continue
+            subscription.requested = False
+            if due:
+                subscription.nextTime = max(subscription.nextTime + subscription.interval, now)
+            if sip.isdeleted(tab):
+                # The tab was deleted without unregistering
+                self.unregister(tab)
+                continue
+            startTime = perf_counter()
+            tab.plotGraph()
+            # Hidden tabs only note that they have to redraw when shown
+            if tab.isVisible():
+                subscription.stats.add(perf_counter() - startTime)
+        cost = perf_counter() - now
+        self.tickCost += SMOOTHING * (cost - self.tickCost)
+        self.schedule()
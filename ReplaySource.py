@@ -0,0 +1,225 @@
+import glob
+import os
+from time import perf_counter, sleep
+
+import numpy as np
+from PyQt5.QtCore import *
+
+from SerialParameters import SerialParameters
+from SerialWorker import SerialSignals
+from WUFrame import WUFrame
+from RdqRecording import RdqReader, RDQ_MAGIC, readHeader
+from TextRecording import TextRecording
+from CalibrationOfData import loadPortCalibration
+from CaptureClock import CapturedBytes
+
+REPLAY_PORT_PREFIX = "REPLAY-"
+# Plain text logs carry no timing, at real-time speed they are replayed with this many lines per second
+TEXT_LINE_RATE = 100
+BLOCK_SIZE = 4096
+
+
+def isReplayPort(port: str):
+    return port is not None and port.upper().startswith(REPLAY_PORT_PREFIX)
+
+
+def recordedCalibrationFile(filePath: str):
+    # Calibration file a .rdq recording was made with, "" if unknown or no longer there
+    try:
+        calibrationFilePath = readHeader(filePath).get("calibrationFile", "")
+    except (OSError, ValueError):
+        return ""
+    return calibrationFilePath if calibrationFilePath and os.path.isfile(calibrationFilePath) else ""
+
+
+def replayParameters(filePath: str, speed: float = 1.0, maxSignalRate: int = 10, calibrationFilePath: str = ""):
+    # speed: 1 = real time, N = N times faster, 0 = as fast as possible
+    serialParameters = SerialParameters(port=REPLAY_PORT_PREFIX + os.path.basename(filePath))
+    serialParameters.calibrationFilePath = calibrationFilePath
+    serialParameters.calibrateInThread = calibrationFilePath != ""
+    serialParameters.readTextIndex = "read_WU_device"
+    serialParameters.maxSignalRate = maxSignalRate
+    serialParameters.replayFilePath = filePath
+    serialParameters.replaySpeed = speed
+    return serialParameters
+
+
+class FrameStream:
+    # Frames of one Kennbin in recording order, decoded block by block
+    def __init__(self, Kennbin: bytes, times, blocks):
+        self.Kennbin = Kennbin
+        self.times = times
+        self.blocks = blocks
+        self.values = None
+        self.crcOk = None
+        self.position = 0
+
+    def next(self):
+        if self.values is None or self.position >= len(self.values):
+            values, crcOk = next(self.blocks)
+            self.values = values.astype('>u2', copy=False)
+            self.crcOk = crcOk
+            self.position = 0
+        frame = self.values[self.position].tobytes(), bool(self.crcOk[self.position])
+        self.position += 1
+        return frame
+
+
+def rdqBlocks(reader: RdqReader):
+    # Sliced before converting, reader.crcOk would convert the whole column for every block
+    for first in range(0, len(reader), BLOCK_SIZE):
+        records = reader.records[first:first + BLOCK_SIZE]
+        yield records['values'], records['crcOk'].astype(bool)
+
+
+def isRdqFile(filePath: str):
+    with open(filePath, 'rb') as file:
+        return file.read(len(RDQ_MAGIC)) == RDQ_MAGIC
+
+
+class ReplayThread(QRunnable):
+    # Replays a recording through the same signals as SerialThread, so tabs can not tell it from a live port.
+    # Supported are .rdq recordings (including the files of further Kennbins), text WU recordings
+    # and plain text logs.
+    def __init__(self, serialParameters: SerialParameters):
+        super().__init__()
+        self.serialParameters = serialParameters
+        self.filePath = serialParameters.replayFilePath
+        self.speed = serialParameters.replaySpeed
+
+        self.signals = SerialSignals()
+        self.is_killed = False
+        self.is_paused = False
+        self.lastRefreshTimeDict = {}
+        self.calibration = loadPortCalibration(serialParameters)
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            streams = self.openStreams()
+        except Exception as e:
+            print("Replaying " + self.filePath + " failed: " + str(e))
+            return None
+
+        self.signals.madeConnection.emit(self.serialParameters)
+        try:
+            if streams:
+                self.replayFrames(streams)
+            else:
+                self.serialParameters.readTextIndex = "read_lines"
+                self.replayLines()
+        except Exception as e:
+            print("Replaying " + self.filePath + " failed: " + str(e))
+        try:
+            self.signals.lostConnection.emit(self.serialParameters)
+        except:
+            pass
+
+    def openStreams(self):
+        if isRdqFile(self.filePath):
+            root, extension = os.path.splitext(self.filePath)
+            filePaths = [self.filePath] + sorted(glob.glob(glob.escape(root) + "_" + "[0-9a-f]" * 4 + extension))
+            streams = []
+            for filePath in filePaths:
+                try:
+                    reader = RdqReader(filePath)
+                except ValueError:
+                    continue
+                streams.append(FrameStream(reader.Kennbin, np.asarray(reader.timestamps), rdqBlocks(reader)))
+            return streams
+
+        recording = TextRecording(self.filePath)
+        streams = []
+        for wordCount in recording.wordCounts():
+            # Text recordings do not store the Kennbin, its first byte (Kennung) follows from the line length
+            Kennbin = bytes([(wordCount - 3) & 0xff, 0])
+            streams.append(FrameStream(Kennbin, recording.frameTimes(wordCount),
+                                       recording.iterFrames(wordCount, BLOCK_SIZE)))
+        return streams
+
+    def waitUntil(self, replayTime: float):
+        # Sleeps until replayTime (seconds since the start of the recording) is reached, honours pause and kill
+        while not self.is_killed:
+            if self.is_paused:
+                pausedAt = perf_counter()
+                while self.is_paused and not self.is_killed:
+                    sleep(0.05)
+                self.startTime += perf_counter() - pausedAt
+                continue
+            if self.speed <= 0:
+                return
+            delay = self.startTime + replayTime / self.speed - perf_counter()
+            if delay <= 0:
+                return
+            sleep(min(delay, 0.05))
+
+    def replayFrames(self, streams: list):
+        times = np.concatenate([stream.times for stream in streams])
+        streamIndex = np.repeat(np.arange(len(streams)), [len(stream.times) for stream in streams])
+        # Frames without a usable time (e.g. text recording without start line) keep their file order
+        times = np.where(np.isfinite(times), times, -np.inf)
+        order = np.argsort(times, kind='stable')
+        finiteTimes = times[np.isfinite(times)]
+        firstTime = finiteTimes.min() if len(finiteTimes) else 0.0
+
+        self.startTime = perf_counter()
+        for position in order:
+            if self.is_killed:
+                break
+            recordTime = times[position]
+            replayTime = recordTime - firstTime if np.isfinite(recordTime) else 0.0
+            self.waitUntil(replayTime)
+            stream = streams[streamIndex[position]]
+            readLine, crcOk = stream.next()
+
+            # Same per Kennbin throttling as a live port, but on the recording clock so the
+            # emitted frames do not depend on the replay speed
+            Kennbin = stream.Kennbin
+            lastRefreshTime = self.lastRefreshTimeDict.get(Kennbin)
+            if lastRefreshTime is None or replayTime >= lastRefreshTime + (1 / self.serialParameters.maxSignalRate):
+                self.lastRefreshTimeDict[Kennbin] = replayTime
+                self.serialParameters.Kennbin = Kennbin
+                frame = WUFrame(Kennbin, readLine, crcOk)
+                if self.calibration is not None:
+                    self.calibration.calibrateFrame(self.serialParameters.port, frame)
+                self.signals.receivedData.emit(self.serialParameters, frame)
+
+    def replayLines(self):
+        self.startTime = perf_counter()
+        with open(self.filePath, 'rb') as file:
+            for lineNumber, readLine in enumerate(file):
+                if self.is_killed:
+                    break
+                self.waitUntil(lineNumber / TEXT_LINE_RATE)
+                self.signals.receivedData.emit(self.serialParameters, CapturedBytes(readLine))
+
+    def writeSerial(self, port, data):
+        pass
+
+    def kill(self, port):
+        if port.upper() == "ALL" or port.upper() == self.serialParameters.port.upper():
+            self.is_killed = True
+
+    def pause(self, port):
+        if port.upper() == "ALL" or port.upper() == self.serialParameters.port.upper():
+            self.is_paused = True
+
+    def resume(self, port):
+        if port.upper() == "ALL" or port.upper() == self.serialParameters.port.upper():
+            self.is_paused = False
+
+    # A replay is already a recording, recording requests are ignored
+    def startRecordData(self, port, filePath, fileName):
+        pass
+
+    def stopRecordData(self, port):
+        pass
+
+    def pauseRecordData(self, port):
+        pass
+
+    def resumeRecordData(self, port):
+        pass
+
+    def writeDataToFile(self, text, port, filePath, fileName):
+        pass
@@ -0,0 +1,102 @@
+import numpy as np
+
+
+class RingBuffer:
+    # Fixed capacity buffer for columns of float values (e.g. x and y of a plot line) with amortised O(1) append.
+    # The storage is twice the capacity: values are appended behind the newest value and only when the end is
+    # reached the newest `capacity` values are moved to the front once. So the values of a column are always a
+    # contiguous slice (view() never copies) and appending never changes a view handed out before, which
+    # pyqtgraph may still hold. capacity = 0 means unlimited, the buffer then grows by doubling.
+    def __init__(self, capacity: int = 0, columns: int = 1, dtype=np.float64):
+        self.columns = columns
+        self.dtype = dtype
+        self.capacity = max(0, int(capacity))
+        self.start = 0
+        self.end = 0
+        if self.capacity > 0:
+            self.data = np.zeros((columns, 2 * self.capacity), dtype=dtype)
+        else:
+            self.data = np.zeros((columns, 1024), dtype=dtype)
+
+    def __len__(self):
+        return self.end - self.start
+
+    def append(self, *values):
+        if self.end == self.data.shape[1]:
+            if self.capacity > 0:
+                self.compact(min(len(self), self.capacity - 1))
+            else:
+                self.relocate(1)
+        self.data[:, self.end] = values
+        self.end += 1
+        if self.capacity > 0 and self.end - self.start > self.capacity:
+            self.start += 1
+
+    def extend(self, *columns):
+        # Appends one array per column at once
+        values = np.asarray(columns, dtype=self.dtype)
+        count = values.shape[1]
+        if self.capacity > 0 and count > self.capacity:
+            values = values[:, -self.capacity:]
+            count = self.capacity
+        if self.end + count > self.data.shape[1]:
+            if self.capacity > 0:
+                self.compact(max(0, min(len(self), self.capacity - count)))
+            else:
+                self.relocate(count)
+        self.data[:, self.end:self.end + count] = values
+        self.end += count
+        if self.capacity > 0 and self.end - self.start > self.capacity:
+            self.start = self.end - self.capacity
+
+    def compact(self, keep: int):
+        # Bounded buffers: moves the newest keep values to the front of new storage. The old storage is left
+        # as it is, so views handed out stay unchanged.
+        data = np.zeros((self.columns, self.data.shape[1]), dtype=self.dtype)
+        data[:, :keep] = self.data[:, self.end - keep:self.end]
+        self.data = data
+        self.start = 0
+        self.end = keep
+
+    def relocate(self, count: int):
+        # Unlimited buffers: moves the values to new storage with room for at least count more values.
+        # The storage grows by doubling and shrinks again after discard().
+        keep = len(self)
+        data = np.zeros((self.columns, max(1024, 2 * (keep + count))), dtype=self.dtype)
+        data[:, :keep] = self.data[:, self.start:self.end]
+        self.data = data
+        self.start = 0
+        self.end = keep
+
+    def discard(self, count: int):
+        # Drops the oldest count values
+        self.start = min(self.end, self.start + max(0, count))
+
+    def view(self, column: int):
+        return self.data[column, self.start:self.end]
+
+    def views(self):
+        return [self.view(column) for column in range(self.columns)]
+
+    def clear(self):
+        # New storage as well, values appended after clearing must not show up in views of the old ones
+        self.data = np.zeros_like(self.data)
+        self.start = 0
+        self.end = 0
+
+    def setCapacity(self, capacity: int):
+        # Keeps the newest values that still fit
+        capacity = max(0, int(capacity))
+        if capacity == self.capacity:
+            return
+        values = self.data[:, self.start:self.end]
+        if capacity > 0:
+            values = values[:, -capacity:]
+        length = values.shape[1]
+        size = 2 * capacity if capacity > 0 else max(1024, 2 * length)
+        data = np.zeros((self.columns, size), dtype=self.dtype)
+        data[:, :length] = values
+        self.data = data
+        self.capacity = capacity
+        self.start = 0
+        self.end = length
@@ -185,8 +185,33 @@ class SerialConnectWindow(QWidget):
         self.maxSignalRateSpinBox.setRange(1, 30)
         self.maxSignalRateSpinBox.setValue(5)
 
+        recordFormatLabel = QLabel("Record format")
+
+        self.recordFormatCombobox = QComboBox()
+        self.recordFormatCombobox.addItem("Text (.txt)")
+        self.recordFormatCombobox.addItem("Binary (.rdq)")
+        self.recordFormatCombobox.setCurrentText("Text (.txt)")
+
+        calibrationFileLabel = QLabel("Calibration file")
+
+        self.calibrationFileLineEdit = QLineEdit()
+        self.calibrationFileLineEdit.setPlaceholderText("none")
+        self.calibrationFileButton = QPushButton("...")
+        self.calibrationFileButton.setFixedWidth(30)
+        self.calibrationFileButton.clicked.connect(self.getCalibrationFilePath)
+        calibrationFileLayout = QHBoxLayout()
+        calibrationFileLayout.addWidget(self.calibrationFileLineEdit)
+        calibrationFileLayout.addWidget(self.calibrationFileButton)
+
+        self.calibrateInThreadCB = QCheckBox("Calibrate in acquisition thread")
+        self.calibrateInThreadCB.setToolTip("Calibrates received WU frames with the calibration file before they are "
+                                            "displayed, tabs using the same file only show the values")
+
         optionsLayout = QFormLayout()
         optionsLayout.addRow(maxSignalRateLabel, self.maxSignalRateSpinBox)
+        optionsLayout.addRow(recordFormatLabel, self.recordFormatCombobox)
+        optionsLayout.addRow(calibrationFileLabel, calibrationFileLayout)
+        optionsLayout.addRow("", self.calibrateInThreadCB)
         # optionsLayout.addWidget(-------------, 0, 0, 1, 1)
 
         optionsGroupbox = QGroupBox("Options")
@@ -236,6 +261,12 @@ class SerialConnectWindow(QWidget):
             self.readBytesSpinBox.setEnabled(False)
             self.readUntilLineEdit.setEnabled(True)
 
+    def getCalibrationFilePath(self):
+        fileName = QFileDialog.getOpenFileName(None, "Open Calibration File", "", "csv(*.csv)\nall(*.*)", "",
+                                               QFileDialog.DontUseNativeDialog)
+        if fileName[0] != "":
+            self.calibrationFileLineEdit.setText(fileName[0])
+
     def getSerialParameter(self):
         serialParam = SerialParameters()
         if self.portCombobox.currentText().strip() != "":
@@ -278,5 +309,9 @@ class SerialConnectWindow(QWidget):
             serialParam.readTextIndex = "read_until"
             serialParam.readUntil = self.readUntilLineEdit.text()[0]
         serialParam.maxSignalRate = self.maxSignalRateSpinBox.value()
+        if self.recordFormatCombobox.currentText() == "Binary (.rdq)":
+            serialParam.recordFormat = "rdq"
+        serialParam.calibrationFilePath = self.calibrationFileLineEdit.text().strip()
+        serialParam.calibrateInThread = self.calibrateInThreadCB.isChecked()
 
         return serialParam
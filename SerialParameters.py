@@ -24,7 +24,17 @@ class SerialParameters:
         self.DTR = False
         self.maxSignalRate = 10  # Hz
         self.Kennbin = ""
+        self.recordFormat = "txt"
+        self.calibrationFilePath = ""
+        self.calibrateInThread = False
+        self.replayFilePath = ""
+        self.replaySpeed = 1.0
 
         self.local_echo = local_echo
         self.appendCR = appendCR
         self.appendLF = appendLF
+
+    def __setstate__(self, state):
+        # Parameters pickled by older versions miss newer attributes, start from the defaults
+        self.__init__()
+        self.__dict__.update(state)
@@ -6,10 +6,13 @@ import serial
 from PyQt5.QtWidgets import QMessageBox
 
 from SerialParameters import SerialParameters
+from WUFrame import WUFrame
+from WUFrameReader import WUFrameReader
+from RecordWriter import RecordWriter
+from RdqRecording import RdqWriter
+from CalibrationOfData import loadPortCalibration
+from CaptureClock import captureTime, toWallClock, CapturedBytes
 
-import binascii
-import libscrc
-import numpy as np
 import platform
 
 
@@ -48,10 +51,13 @@ class SerialThread(QRunnable):
         self.recordingStarted = False
         self.record = False
         self.recordFilePath = os.getcwd() + "/test2.txt"
+        self.recordWriter = None
         self.lastRefreshTime = 0
         self.failCounter = 0
 
         self.lastRefreshTimeDict = {}
+        self.wuFrameReader = WUFrameReader()
+        self.calibration = loadPortCalibration(self.serialParameters)
 
         if platform.system() == "Linux":
             self.serialArduino.port = "/dev/" + self.serialParameters.port
@@ -59,6 +65,12 @@ class SerialThread(QRunnable):
 
     @pyqtSlot()  # Decorator function to show that this method is a slot
     def run(self):
+        try:
+            self.readSerial()
+        finally:
+            self.closeRecordWriter()
+
+    def readSerial(self):
         if not self.serialArduino.isOpen():
             try:
                 self.serialArduino.open()
@@ -74,6 +86,7 @@ class SerialThread(QRunnable):
                         if self.serialParameters.readTextIndex == "read_lines":
                             readLine = self.read_line()  # self.serialArduino.readline()
                             if not readLine == b'':
+                                readLine = CapturedBytes(readLine)
                                 #try:
                                 #readLine.decode('utf-8')
                                 #except UnicodeDecodeError as e:
@@ -88,6 +101,7 @@ class SerialThread(QRunnable):
                         elif self.serialParameters.readTextIndex == "read_bytes":
                             readLine = self.serialArduino.read(self.serialParameters.readBytes)
                             if not readLine == b'':
+                                readLine = CapturedBytes(readLine)
                                 #try:
                                 #    readLine.decode('utf-8')
                                 #except UnicodeDecodeError as e:
@@ -105,46 +119,35 @@ class SerialThread(QRunnable):
                                     print(e)
                                     self.signals.lostConnection.emit(self.serialParameters)
                                     return None
-                                self.signals.receivedData.emit(self.serialParameters, readLine)
+                                self.signals.receivedData.emit(self.serialParameters, CapturedBytes(readLine))
                         elif self.serialParameters.readTextIndex == "logging_raw":
                             with open('loggingRaw2.txt', 'a') as file:
                                 readChar = self.serialArduino.read(1)
                                 if readChar != b'':
                                     file.write(str(readChar))
                         elif self.serialParameters.readTextIndex == "read_WU_device":
-                            if self.serialArduino.read(1) == b'\xaa':
-                                if self.serialArduino.read(1) == b'\x55':
-                                    Kennbin = self.serialArduino.read(2)
-                                    Kennung = int(binascii.hexlify(Kennbin[:1]), 16)
-                                    readLine = self.serialArduino.read(2 * Kennung + 2 + 2)
-                                    if not readLine == b'':
-                                        crc16send = readLine[-2:]
-                                        crc16 = libscrc.modbus(Kennbin + readLine[0:-2])
-                                        crc_check = crc16 == int(binascii.hexlify(crc16send), 16)
-
-                                        data = []
-                                        for n in range(len(readLine) // 2):
-                                            data.append(str(binascii.hexlify(readLine[2 * n:2 * n + 2]))[2:6])
-                                        singleLine = np.asarray(data)
-                                        if not crc_check:
-                                            singleLine = np.append(singleLine, '4650')
-                                            if self.record:
-                                                self.failCounter += 1
-                                        else:
-                                            singleLine = np.append(singleLine, '4f4b')
-                                        # if not crc_check:
-                                        #     singleLine[-1] = 'aaaa'
-
-                                        if self.record:
-                                            self.recordData(singleLine)
-
-                                        if Kennbin not in self.lastRefreshTimeDict:
-                                            self.lastRefreshTimeDict[Kennbin] = 0
-
-                                        if time() > self.lastRefreshTimeDict[Kennbin] + (1 / self.serialParameters.maxSignalRate):
-                                            self.lastRefreshTimeDict[Kennbin] = time()
-                                            self.serialParameters.Kennbin = Kennbin
-                                            self.signals.receivedData.emit(self.serialParameters, singleLine)
+                            chunk = self.serialArduino.read(max(1, self.serialArduino.in_waiting))
+                            if chunk == b'':
+                                continue
+                            # All frames completed by this read share its capture time
+                            chunkTime = captureTime()
+                            for Kennbin, readLine, crc_check in self.wuFrameReader.feed(chunk):
+                                frame = WUFrame(Kennbin, readLine, crc_check, chunkTime)
+                                if not crc_check and self.record:
+                                    self.failCounter += 1
+
+                                if self.record:
+                                    self.recordData(frame)
+
+                                if Kennbin not in self.lastRefreshTimeDict:
+                                    self.lastRefreshTimeDict[Kennbin] = 0
+
+                                if chunkTime > self.lastRefreshTimeDict[Kennbin] + (1 / self.serialParameters.maxSignalRate):
+                                    self.lastRefreshTimeDict[Kennbin] = chunkTime
+                                    self.serialParameters.Kennbin = Kennbin
+                                    if self.calibration is not None:
+                                        self.calibration.calibrateFrame(self.serialParameters.port, frame)
+                                    self.signals.receivedData.emit(self.serialParameters, frame)
                     else:
                         self.signals.lostConnection.emit(self.serialParameters)
                         return None
@@ -182,41 +185,39 @@ class SerialThread(QRunnable):
             fileName += datetime.now().strftime("%d-%m-%Y_%H-%M-%S") + ".txt"
         if port.upper() == "ALL":
             fileName = fileName.split(".")[0] + "_" + str(self.serialParameters.port) + ".txt"
+        if self.isBinaryRecording():
+            fileName = os.path.splitext(fileName)[0] + ".rdq"
         self.recordFilePath = filePath + fileName
         self.failCounter = 0
+        self.openRecordWriter()
         self.recordingStarted = True
         self.record = True
 
-        if self.serialParameters.readTextIndex == "read_WU_device":
-            with open(self.recordFilePath, 'a') as file:
-                file.write(float.hex(time()) + "\n")
+        if self.serialParameters.readTextIndex == "read_WU_device" and not self.isBinaryRecording():
+            self.writeRecordText(float.hex(toWallClock(captureTime())) + "\n")
 
     def stopRecordData(self, port):
         if not port.upper() == "ALL" and not port.upper() == self.serialParameters.port.upper():
             return None
 
-        self.recordingStarted = False
         self.record = False
 
         if not self.recordingStarted:
             return None
+        self.recordingStarted = False
 
-        if self.serialParameters.readTextIndex == "read_WU_device":
-            #occurrences = 0
-            #with open(self.recordFilePath, 'r') as file:
-            #    occurrences = file.read().count("aaaa")
-            #with open(self.recordFilePath, 'a') as file:
-            #    file.write(float.hex(time()) + "\n")
-            #    file.write("FatalError = " + str(occurrences) + "\n")
-
-            with open(self.recordFilePath, 'a') as file:
-                file.write(float.hex(time()) + "\n")
-                file.write("FatalError = " + str(self.failCounter) + "\n")
+        if self.serialParameters.readTextIndex == "read_WU_device" and not self.isBinaryRecording():
+            self.writeRecordText(float.hex(toWallClock(captureTime())) + "\n")
+            self.writeRecordText("FatalError = " + str(self.failCounter) + "\n")
+        self.closeRecordWriter()
 
     def pauseRecordData(self, port):
         if not port.upper() == "ALL" and not port.upper() == self.serialParameters.port.upper():
             return None
         self.record = False
+        recordWriter = self.recordWriter
+        if recordWriter is not None:
+            recordWriter.sync()
 
     def resumeRecordData(self, port):
         if not port.upper() == "ALL" and not port.upper() == self.serialParameters.port.upper():
@@ -240,17 +241,58 @@ class SerialThread(QRunnable):
                 fileName += datetime.now().strftime("%d-%m-%Y_%H-%M-%S") + ".txt"
             if port.upper() == "ALL":
                 fileName = fileName.split(".")[0] + "_" + str(self.serialParameters.port) + ".txt"
+            if self.isBinaryRecording():
+                fileName = os.path.splitext(fileName)[0] + ".rdq"
+            if self.recordWriter is not None and self.recordFilePath != filePath + fileName:
+                self.closeRecordWriter()
+                self.recordFilePath = filePath + fileName
+                self.openRecordWriter()
             self.recordFilePath = filePath + fileName
             self.failCounter = 0
 
         if self.serialParameters.readTextIndex == "read_WU_device":
-            with open(self.recordFilePath, 'a') as file:
-                file.write(text)
+            self.writeRecordText(text)
         self.record = lastRecord
 
-    def recordData(self, data):
-        with open(self.recordFilePath, 'a') as file:
-            file.write(' '.join(data) + "\n")
+    def isBinaryRecording(self):
+        return self.serialParameters.readTextIndex == "read_WU_device" and self.serialParameters.recordFormat == "rdq"
+
+    def openRecordWriter(self):
+        self.closeRecordWriter()
+        if self.isBinaryRecording():
+            self.recordWriter = RdqWriter(self.recordFilePath, self.serialParameters.port,
+                                          self.serialParameters.baudrate, self.serialParameters.calibrationFilePath)
+        else:
+            self.recordWriter = RecordWriter(self.recordFilePath)
+
+    def closeRecordWriter(self):
+        recordWriter = self.recordWriter
+        self.recordWriter = None
+        if recordWriter is not None:
+            recordWriter.close()
+
+    def writeRecordText(self, text):
+        recordWriter = self.recordWriter
+        if recordWriter is None or not recordWriter.write(text):
+            filePath = self.recordFilePath
+            if self.isBinaryRecording():
+                # No rdq recording to keep it as note, the text goes to a text file next to it
+                filePath = os.path.splitext(filePath)[0] + ".txt"
+                print("No rdq recording open, writing text to " + filePath)
+            try:
+                with open(filePath, 'a') as file:
+                    file.write(text)
+            except OSError as e:
+                print("Could not write record file " + filePath + ": " + str(e))
+
+    def recordData(self, frame: WUFrame):
+        recordWriter = self.recordWriter
+        if recordWriter is None:
+            return
+        if isinstance(recordWriter, RdqWriter):
+            recordWriter.writeFrame(frame)
+        else:
+            recordWriter.write(frame.recordLine() + "\n")
 
     def writeSerial(self, port, data):
         if port.upper() == "ALL" or port.upper() == self.serialParameters.port.upper():
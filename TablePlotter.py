@@ -1,4 +1,3 @@
-import binascii
 import math
 import os
 
@@ -235,7 +234,7 @@ class TablePlotter(Tab):
 
     def resizeTable(self, rowCount: int, columnCount: int):
         if rowCount == 0:
-            rowCount = int(math.ceil(len(self.receivedData[1:]) / columnCount))
+            rowCount = int(math.ceil(len(self.receivedValueData[1:]) / columnCount))
 
         self.colNumber = columnCount
         self.changeTableSize(rowCount, columnCount)
@@ -245,19 +244,19 @@ class TablePlotter(Tab):
         for countY in range(0, self.table.rowCount()):
             for countX in range(0, self.table.columnCount()):
                 tableContendIndex = countY * (self.table.columnCount()) + countX
-                if len(self.receivedData[1:]) > tableContendIndex:
+                if len(self.receivedValueData[1:]) > tableContendIndex:
                     if self.receivedCalValueData and self.shownType == "cal. Values" and \
                             self.calibration.configured and len(self.receivedCalValueData[1:]) > tableContendIndex:
                         self.table.setItem(countY, countX,
                                            QTableWidgetItem("%.2f" % self.receivedCalValueData[1:][tableContendIndex]))
                     elif self.shownType == "Hex":
-                        self.table.setItem(countY, countX, QTableWidgetItem(self.receivedData[1:][tableContendIndex]))
+                        self.table.setItem(countY, countX, QTableWidgetItem("%04x" % self.receivedValueData[1:][tableContendIndex]))
                     elif self.shownType == "Values":
                         self.table.setItem(countY, countX, QTableWidgetItem(str(self.receivedValueData[1:][tableContendIndex])))
                     else:
                         self.table.setItem(countY, countX, QTableWidgetItem(""))
 
-                    number = int(self.receivedData[1:][tableContendIndex], 16)
+                    number = self.receivedValueData[1:][tableContendIndex]
                     self.table.item(countY, countX).setBackground(QColor(self.colorScale(number).hexcode))
                 else:
                     self.table.setItem(countY, countX, QTableWidgetItem(""))
@@ -350,7 +349,9 @@ class TablePlotter(Tab):
                 self.stopRecordSignal.emit(self.portCombobox.currentText())
 
     def receiveData(self, obj: SerialParameters, data):
-        kennbin = binascii.hexlify(obj.Kennbin).decode("utf-8")
+        if obj.readTextIndex != "read_WU_device":
+            return
+        kennbin = data.Kennbin.hex()
         if(self.kennbinCombobox.findText(kennbin) == -1):
             self.kennbinCombobox.addItem(kennbin)
         if self.kennbinCombobox.currentText() != kennbin and \
@@ -366,39 +367,32 @@ class TablePlotter(Tab):
             if time.time() > self.lastRefreshTime + (1 / self.maxRefreshRate):
                 self.lastRefreshTime = time.time()
                 self.receivedData = data
-                if len(data[1:]) != self.currentLengthOfData:
-                    self.currentLengthOfData = len(data[1:])
-                    self.clearTable(len(data[1:]))
-                    if int(math.ceil(len(data[1:]) / self.colNumber)) != self.table.rowCount():
-                        self.resizeTable(int(math.ceil(len(data[1:]) / self.colNumber)), self.colNumber)
-
-                self.receivedValueData = []
-                for numberIndex in range(0, len(data)):
-                    self.receivedValueData.append(int(data[numberIndex], 16))
+                self.receivedValueData = data.values.tolist()
+                if len(data) - 1 != self.currentLengthOfData:
+                    self.currentLengthOfData = len(data) - 1
+                    self.clearTable(len(data) - 1)
+                    if int(math.ceil((len(data) - 1) / self.colNumber)) != self.table.rowCount():
+                        self.resizeTable(int(math.ceil((len(data) - 1) / self.colNumber)), self.colNumber)
 
                 self.receivedCalValueData = []
                 if self.calibration.configured:
-                    self.receivedCalValueData = self.calibration.calibrate(self.receivedValueData)
+                    self.receivedCalValueData = self.calibration.calibrateFrame(obj.port, data)
 
-                self.dataCounterLabel.setText(str(int(data[0], 16)))
+                self.dataCounterLabel.setText(str(self.receivedValueData[0]))
 
-                temp_data = []
-                temp_receivedData = []
                 temp_receivedValueData = []
                 temp_receivedCalValueData = []
-                if len(data) > 1:
-                    temp_data = data[1:]
                 if len(self.receivedValueData) > 1:
                     temp_receivedValueData = self.receivedValueData[1:]
                 if self.receivedCalValueData is not None and len(self.receivedCalValueData) > 1:
                     temp_receivedCalValueData = self.receivedCalValueData[1:]
 
-                for numberIndex in range(0, len(temp_data)):
+                for numberIndex in range(0, len(temp_receivedValueData)):
                     rowCount = numberIndex // self.colNumber
                     colCount = numberIndex % self.colNumber
 
                     if self.shownType == "Hex":
-                        self.table.item(rowCount, colCount).setText(temp_data[numberIndex])
+                        self.table.item(rowCount, colCount).setText("%04x" % temp_receivedValueData[numberIndex])
                     elif self.shownType == "Values":
                         self.table.item(rowCount, colCount).setText(str(temp_receivedValueData[numberIndex]))
                     elif self.shownType == "cal. Values":
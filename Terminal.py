@@ -1,4 +1,6 @@
+import re
 import time
+from collections import deque
 
 from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
@@ -8,6 +10,26 @@ from datetime import datetime
 import serial
 import serial.tools.list_ports
 from SerialParameters import SerialParameters
+from CaptureClock import toWallClock, timestampOf, TimestampFormatter
+from TerminalLogger import TerminalLogger
+from HexView import HexView
+from WUFrame import WUFrame
+from TerminalSearch import LineSearch
+
+# Lines kept by default when "Clamp lines" is checked
+DEFAULT_LINE_CAPACITY = 1000
+# Received lines are collected and added to the view at most this often (ms)
+FLUSH_INTERVAL = 30
+# Characters QPlainTextEdit starts a new block at, a received chunk is stored as one line per block
+LINE_BREAK_RE = re.compile('\r\n|[\r\n\u2029\ufdd0\ufdd1]')
+# The search runs this long after the last keystroke (ms)
+SEARCH_DELAY = 200
+# Log rotation choices: (maximum bytes, maximum seconds) per log segment, 0 = no limit
+LOG_ROTATIONS = {"No rotation": (0, 0),
+                 "10 MB": (10 * 1024 * 1024, 0),
+                 "100 MB": (100 * 1024 * 1024, 0),
+                 "1 h": (0, 3600),
+                 "1 day": (0, 86400)}
 
 
 class PortCombobox(QComboBox):
@@ -43,6 +65,8 @@ class Terminal(Tab):
         super().__init__("Terminal", name, port, UUID, parent)
 
         self.loggingFileName = "test2.txt"
+        self.logger = None
+        self.timestampFormatter = TimestampFormatter("%m/%d/%Y %H:%M:%S")
 
         self.connectedPorts = connectedPorts
         self.port = port
@@ -71,6 +95,10 @@ class Terminal(Tab):
         self.baudrateCombobox.addItem("2000000 Baud")
         self.baudrateCombobox.setCurrentText("ALL Baud")
 
+        self.viewModeCombobox = QComboBox()
+        self.viewModeCombobox.addItems(["Text", "Hex"])
+        self.viewModeCombobox.currentTextChanged.connect(self.setViewMode)
+
         self.clearTextButton = QPushButton("Clear output")
         self.clearTextButton.clicked.connect(self.clearText)
 
@@ -78,10 +106,64 @@ class Terminal(Tab):
         optionsLayout.addWidget(self.portCombobox)
         optionsLayout.addWidget(self.baudrateCombobox)
         optionsLayout.addStretch()
+        optionsLayout.addWidget(self.viewModeCombobox)
         optionsLayout.addWidget(self.clearTextButton)
 
-        self.textEdit = QTextEdit()
+        # The document drops its oldest lines itself (maximumBlockCount), so a line costs the same however
+        # long the terminal runs. self.lines holds the same lines as text.
+        self.textEdit = QPlainTextEdit()
         self.textEdit.setReadOnly(True)
+        self.lines = deque()
+        # Number of the next received line, lines are numbered from the start of the session
+        self.lineCount = 0
+        self.pendingLines = []
+        self.flushTimer = QTimer()
+        self.flushTimer.setSingleShot(True)
+        self.flushTimer.timeout.connect(self.flushLines)
+
+        self.lineSearch = LineSearch()
+        # Line number of the shown search result
+        self.currentMatch = None
+        self.searchTimer = QTimer()
+        self.searchTimer.setSingleShot(True)
+        self.searchTimer.timeout.connect(self.updateSearch)
+        self.searchLineEdit = QLineEdit()
+        self.searchLineEdit.setPlaceholderText("Search")
+        self.searchLineEdit.textChanged.connect(self.scheduleSearch)
+        self.searchLineEdit.returnPressed.connect(self.findNext)
+        self.searchRegexCheckbox = QCheckBox("Regex")
+        self.searchRegexCheckbox.stateChanged.connect(self.scheduleSearch)
+        self.searchCaseCheckbox = QCheckBox("Match case")
+        self.searchCaseCheckbox.stateChanged.connect(self.scheduleSearch)
+        self.findPreviousButton = QPushButton("<")
+        self.findPreviousButton.setFixedWidth(30)
+        self.findPreviousButton.clicked.connect(self.findPrevious)
+        self.findNextButton = QPushButton(">")
+        self.findNextButton.setFixedWidth(30)
+        self.findNextButton.clicked.connect(self.findNext)
+        self.searchLabel = QLabel()
+
+        searchLayout = QHBoxLayout()
+        searchLayout.setContentsMargins(0, 0, 0, 0)
+        searchLayout.addWidget(self.searchLineEdit)
+        searchLayout.addWidget(self.searchRegexCheckbox)
+        searchLayout.addWidget(self.searchCaseCheckbox)
+        searchLayout.addWidget(self.findPreviousButton)
+        searchLayout.addWidget(self.findNextButton)
+        searchLayout.addWidget(self.searchLabel)
+
+        textLayout = QVBoxLayout()
+        textLayout.setContentsMargins(0, 0, 0, 0)
+        textLayout.addWidget(self.textEdit)
+        textLayout.addLayout(searchLayout)
+        self.textPage = QWidget()
+        self.textPage.setLayout(textLayout)
+
+        # The received bytes as hex dump, filled in both modes so switching shows the history
+        self.hexView = HexView()
+        self.viewStack = QStackedWidget()
+        self.viewStack.addWidget(self.textPage)
+        self.viewStack.addWidget(self.hexView)
 
         self.autoscrollCheckbox = QCheckBox("Autoscroll")
         self.autoscrollCheckbox.setChecked(True)
@@ -97,16 +179,35 @@ class Terminal(Tab):
         self.loggingCheckbox.adjustSize()
         self.loggingCheckbox.stateChanged.connect(self.btnstate)
 
+        self.logRotationCombobox = QComboBox()
+        self.logRotationCombobox.addItems(list(LOG_ROTATIONS))
+        self.logRotationCombobox.currentTextChanged.connect(self.setLogRotation)
+
+        self.logCompressCheckbox = QCheckBox("gzip")
+        self.logCompressCheckbox.setToolTip("Compress finished log segments")
+        self.logCompressCheckbox.adjustSize()
+        self.logCompressCheckbox.stateChanged.connect(self.setLogRotation)
+
         self.maxLinesCheckbox = QCheckBox("Clamp lines")
         self.maxLinesCheckbox.setChecked(True)
         self.maxLinesCheckbox.adjustSize()
+        self.maxLinesCheckbox.stateChanged.connect(self.setLineCapacity)
+
+        self.maxLinesSpinBox = QSpinBox()
+        self.maxLinesSpinBox.setRange(100, 1000000)
+        self.maxLinesSpinBox.setSingleStep(1000)
+        self.maxLinesSpinBox.setValue(DEFAULT_LINE_CAPACITY)
+        self.maxLinesSpinBox.valueChanged.connect(self.setLineCapacity)
 
         options2Layout = QHBoxLayout()
         options2Layout.addWidget(self.autoscrollCheckbox)
         options2Layout.addWidget(self.timestampCheckbox)
         options2Layout.addWidget(self.portstampCheckbox)
         options2Layout.addWidget(self.loggingCheckbox)
+        options2Layout.addWidget(self.logRotationCombobox)
+        options2Layout.addWidget(self.logCompressCheckbox)
         options2Layout.addWidget(self.maxLinesCheckbox)
+        options2Layout.addWidget(self.maxLinesSpinBox)
         options2Layout.addStretch()
 
         self.lineEdit = QLineEdit()
@@ -127,13 +228,16 @@ class Terminal(Tab):
 
         mainLayout = QVBoxLayout()
         mainLayout.addLayout(optionsLayout)
-        mainLayout.addWidget(self.textEdit)
+        mainLayout.addWidget(self.viewStack)
         mainLayout.addLayout(options2Layout)
         mainLayout.addLayout(sendLayout)
 
         self.setLayout(mainLayout)
 
+        self.setLineCapacity()
         self.initUI()
+        # Tabs closed with deleteLater() never get a closeEvent, the log file must not stay open
+        self.destroyed.connect(lambda: self.closeLogger())
 
     def initUI(self):
         if self.port == "COM-ALL":
@@ -189,7 +293,7 @@ class Terminal(Tab):
         if self.timestampCheckbox.isChecked() or self.portstampCheckbox.isChecked():
             line += "|"
         if self.timestampCheckbox.isChecked():
-            line += datetime.now().strftime("%m/%d/%Y %H:%M:%S")
+            line += self.timestampFormatter(toWallClock(timestampOf(data)))
         if self.portstampCheckbox.isChecked():
             line += " " + obj.port
         if line != "":
@@ -200,24 +304,146 @@ class Terminal(Tab):
         except:
             line += str(data) + "\n"
 
-        self.textEdit.append(line.strip('\n\r'))
-        if self.loggingCheckbox.isChecked():
-            with open(self.loggingFileName, 'a') as file:
-                file.write(line.rstrip('\n'))
-        if self.maxLinesCheckbox.isChecked():
-            plainText = self.textEdit.toPlainText()
-            if len(plainText) > 15000:
-                self.textEdit.setPlainText(plainText[-14000:])
+        self.hexView.append(data.wireBytes() if isinstance(data, WUFrame) else data)
+        # One entry per document block, so line numbers are block numbers
+        shownLines = LINE_BREAK_RE.split(line.strip('\n\r'))
+        self.lines.extend(shownLines)
+        self.lineCount += len(shownLines)
+        self.pendingLines.extend(shownLines)
+        if not self.flushTimer.isActive():
+            self.flushTimer.start(FLUSH_INTERVAL)
+        if self.logger is not None:
+            self.logger.write(line.rstrip('\n'))
+
+    def flushLines(self):
+        # One insert and one scroll for all lines received since the last flush
+        self.hexView.sync(self.autoscrollCheckbox.isChecked())
+        if not self.pendingLines:
+            return
+        capacity = self.lineCapacity()
+        if capacity > 0:
+            # Older lines would be dropped by the document right away
+            self.pendingLines = self.pendingLines[-capacity:]
+        if self.lineSearch.pattern:
+            self.lineSearch.dropBefore(self.firstLineNumber())
+            self.lineSearch.addLines(self.pendingLines, self.lineCount - len(self.pendingLines))
+        self.textEdit.appendPlainText("\n".join(self.pendingLines))
+        self.pendingLines = []
+        if self.lineSearch.pattern:
+            self.updateSearchLabel()
         if self.autoscrollCheckbox.isChecked():
             self.textEdit.moveCursor(QTextCursor.End)
 
+    def firstLineNumber(self):
+        # Number of the oldest stored line
+        return self.lineCount - len(self.lines)
+
+    def scheduleSearch(self):
+        # Typing restarts the timer, the history is searched once the user pauses
+        self.searchTimer.start(SEARCH_DELAY)
+
+    def updateSearch(self):
+        self.searchTimer.stop()
+        self.flushLines()
+        try:
+            self.lineSearch.setPattern(self.searchLineEdit.text(), self.searchRegexCheckbox.isChecked(),
+                                       self.searchCaseCheckbox.isChecked(), list(self.lines),
+                                       self.firstLineNumber())
+        except re.error as e:
+            self.lineSearch.setPattern("", False, False, list(self.lines), self.firstLineNumber())
+            self.searchLabel.setText("Invalid expression: " + str(e))
+            return
+        self.updateSearchLabel()
+
+    def updateSearchLabel(self):
+        if not self.lineSearch.pattern:
+            self.searchLabel.setText("")
+            return
+        position = self.lineSearch.position(self.currentMatch) if self.currentMatch is not None else 0
+        if position > 0:
+            self.searchLabel.setText(str(position) + "/" + str(len(self.lineSearch)))
+        else:
+            self.searchLabel.setText(str(len(self.lineSearch)) + " matches")
+
+    def findNext(self):
+        self.findMatch(False)
+
+    def findPrevious(self):
+        self.findMatch(True)
+
+    def findMatch(self, backwards: bool):
+        if self.searchTimer.isActive() or not self.lineSearch.pattern:
+            self.updateSearch()
+        self.flushLines()
+        self.lineSearch.dropBefore(self.firstLineNumber())
+        current = self.currentMatch
+        if current is not None and current < self.firstLineNumber():
+            current = None
+        if backwards:
+            number = self.lineSearch.previous(current)
+        else:
+            number = self.lineSearch.next(current)
+        self.currentMatch = number
+        self.updateSearchLabel()
+        if number is not None:
+            self.showLine(number)
+
+    def showLine(self, number: int):
+        # Selects the match in line number and scrolls to it. Autoscroll would scroll away again.
+        self.autoscrollCheckbox.setChecked(False)
+        block = self.textEdit.document().findBlockByNumber(number - self.firstLineNumber())
+        if not block.isValid():
+            return
+        start, end = self.lineSearch.span(block.text())
+        cursor = QTextCursor(block)
+        cursor.setPosition(block.position() + start)
+        cursor.setPosition(block.position() + end, QTextCursor.KeepAnchor)
+        self.textEdit.setTextCursor(cursor)
+        self.textEdit.centerCursor()
+
+    def setViewMode(self, mode: str):
+        if mode == "Hex":
+            self.viewStack.setCurrentWidget(self.hexView)
+            self.hexView.sync(self.autoscrollCheckbox.isChecked())
+        else:
+            self.viewStack.setCurrentWidget(self.textPage)
+
+    def lineCapacity(self):
+        # 0: unlimited
+        if self.maxLinesCheckbox.isChecked():
+            return self.maxLinesSpinBox.value()
+        return 0
+
+    def setLineCapacity(self):
+        capacity = self.lineCapacity()
+        self.maxLinesSpinBox.setEnabled(capacity > 0)
+        self.lines = deque(self.lines, maxlen=capacity if capacity > 0 else None)
+        self.textEdit.setMaximumBlockCount(capacity)
+
     def btnstate(self, state):
         if state == Qt.Checked:
             date_time = datetime.now().strftime("%m-%d-%Y_%H-%M-%S")
             self.loggingFileName = "logging Terminal " + date_time + ".txt"
+            self.closeLogger()
+            self.logger = TerminalLogger(self.loggingFileName)
+            self.setLogRotation()
+        else:
+            self.closeLogger()
+
+    def setLogRotation(self):
+        if self.logger is None:
+            return
+        self.logger.maxBytes, self.logger.rotateInterval = LOG_ROTATIONS[self.logRotationCombobox.currentText()]
+        self.logger.compress = self.logCompressCheckbox.isChecked()
+
+    def closeLogger(self):
+        logger = self.logger
+        self.logger = None
+        if logger is not None:
+            logger.close()
 
     def closeEvent(self, event):
-        pass
+        self.closeLogger()
 
     def applySettings(self, settings: QSettings = None):
         if settings.contains(self.uuid):
@@ -232,9 +458,13 @@ class Terminal(Tab):
             self.autoscrollCheckbox.setChecked(tempSettings["autoscroll"])
             self.timestampCheckbox.setChecked(tempSettings["timestamp"])
             self.portstampCheckbox.setChecked(tempSettings["portstamp"])
+            self.logRotationCombobox.setCurrentText(tempSettings.get("logrotation", "No rotation"))
+            self.logCompressCheckbox.setChecked(tempSettings.get("logcompress", False))
             self.loggingCheckbox.setChecked(tempSettings["logging"])
             self.maxLinesCheckbox.setChecked(tempSettings["maxlines"])
+            self.maxLinesSpinBox.setValue(tempSettings.get("maxlinecount", DEFAULT_LINE_CAPACITY))
             self.newLineCharCombobox.setCurrentText(tempSettings["newlinechar"])
+            self.viewModeCombobox.setCurrentText(tempSettings.get("viewmode", "Text"))
 
     def saveSettings(self, settings: QSettings = None):
         tempSettings = {"port": self.portCombobox.currentText(),
@@ -244,8 +474,12 @@ class Terminal(Tab):
                         "timestamp": self.timestampCheckbox.isChecked(),
                         "portstamp": self.portstampCheckbox.isChecked(),
                         "logging": self.loggingCheckbox.isChecked(),
+                        "logrotation": self.logRotationCombobox.currentText(),
+                        "logcompress": self.logCompressCheckbox.isChecked(),
                         "maxlines": self.maxLinesCheckbox.isChecked(),
-                        "newlinechar": self.newLineCharCombobox.currentText()}
+                        "maxlinecount": self.maxLinesSpinBox.value(),
+                        "newlinechar": self.newLineCharCombobox.currentText(),
+                        "viewmode": self.viewModeCombobox.currentText()}
         settings.setValue(self.uuid, tempSettings)
 
     def sendData(self):
@@ -264,3 +498,9 @@ class Terminal(Tab):
 
     def clearText(self):
         self.textEdit.clear()
+        self.lines.clear()
+        self.pendingLines = []
+        self.lineSearch.clear()
+        self.currentMatch = None
+        self.updateSearchLabel()
+        self.hexView.clear()
@@ -0,0 +1,72 @@
+import gzip
+import os
+import shutil
+import threading
+from time import monotonic
+
+from RecordWriter import RecordWriter
+
+
+def compressFile(filePath: str):
+    # Replaces filePath by filePath.gz
+    try:
+        with open(filePath, 'rb') as source, gzip.open(filePath + ".gz", 'wb') as target:
+            shutil.copyfileobj(source, target)
+        os.remove(filePath)
+    except OSError as e:
+        print("Could not compress " + filePath + ": " + str(e))
+
+
+class TerminalLogger:
+    # Writes terminal lines through a RecordWriter (file kept open, buffered, flushed by a background thread).
+    # The log is continued in a new segment "<name>_<n><ext>" when maxBytes are written or rotateInterval
+    # seconds passed (0 disables either). Finished segments are closed and optionally gzipped in the
+    # background, so rotating never waits for the disk.
+    def __init__(self, filePath: str, maxBytes: int = 0, rotateInterval: float = 0, compress: bool = False):
+        self.filePath = filePath
+        self.maxBytes = maxBytes
+        self.rotateInterval = rotateInterval
+        self.compress = compress
+        self.segment = 0
+        self.segmentPath = filePath
+        self.writer = RecordWriter(filePath)
+        self.segmentSize = 0
+        self.segmentStartTime = monotonic()
+
+    def nextSegmentPath(self):
+        root, extension = os.path.splitext(self.filePath)
+        while True:
+            self.segment += 1
+            segmentPath = root + "_" + str(self.segment) + extension
+            if not os.path.exists(segmentPath) and not os.path.exists(segmentPath + ".gz"):
+                return segmentPath
+
+    def write(self, text: str):
+        if self.writer is None:
+            return False
+        if (self.maxBytes > 0 and self.segmentSize >= self.maxBytes) or \
+                (self.rotateInterval > 0 and monotonic() - self.segmentStartTime >= self.rotateInterval):
+            self.rotate()
+        self.segmentSize += len(text)
+        return self.writer.write(text)
+
+    def rotate(self):
+        writer = self.writer
+        compress = self.compress
+        self.segmentPath = self.nextSegmentPath()
+        self.writer = RecordWriter(self.segmentPath)
+        self.segmentSize = 0
+        self.segmentStartTime = monotonic()
+        threading.Thread(target=self.finishSegment, args=(writer, compress), name="TerminalLogger rotate",
+                         daemon=True).start()
+
+    def finishSegment(self, writer: RecordWriter, compress: bool):
+        writer.close()
+        if compress:
+            compressFile(writer.filePath)
+
+    def close(self):
+        writer = self.writer
+        self.writer = None
+        if writer is not None:
+            writer.close()
@@ -0,0 +1,121 @@
+import re
+from bisect import bisect_left, bisect_right
+
+
+class LineSearch:
+    # Numbers of the terminal lines matching a substring or regular expression. Lines are numbered from the
+    # start of the session, so numbers stay valid when the oldest lines are dropped. The index is kept up to
+    # date incrementally: new lines are scanned once when they arrive (addLines), dropped lines are forgotten
+    # (dropBefore), and a substring that only got longer filters the previous matches instead of scanning
+    # the history again.
+    def __init__(self):
+        self.pattern = ""
+        self.regex = False
+        self.caseSensitive = False
+        self.expression = None
+        # Ascending line numbers, matches before self.first were dropped
+        self.matches = []
+        self.first = 0
+        # Lines before this number are in the index
+        self.scannedEnd = 0
+
+    def __len__(self):
+        return len(self.matches) - self.first
+
+    def clear(self):
+        self.matches = []
+        self.first = 0
+        self.scannedEnd = 0
+
+    def setPattern(self, pattern: str, regex: bool, caseSensitive: bool, lines: list, firstNumber: int):
+        # Searches lines (numbered from firstNumber) for the new pattern. Raises re.error for invalid expressions.
+        narrowing = (self.pattern and not regex and not self.regex and caseSensitive == self.caseSensitive and
+                     self.pattern in pattern and self.scannedEnd == firstNumber + len(lines))
+        if regex:
+            expression = re.compile(pattern, 0 if caseSensitive else re.IGNORECASE)
+        elif not caseSensitive:
+            expression = re.compile(re.escape(pattern), re.IGNORECASE)
+        else:
+            expression = None
+        self.pattern = pattern
+        self.regex = regex
+        self.caseSensitive = caseSensitive
+        self.expression = expression
+        if not pattern:
+            self.clear()
+            self.scannedEnd = firstNumber + len(lines)
+            return
+        if narrowing:
+            # Every line containing the longer substring contained the shorter one
+            stored = bisect_left(self.matches, firstNumber, self.first)
+            self.matches = self.filter(self.matches[stored:], lines, firstNumber)
+            self.first = 0
+            return
+        self.matches = self.scan(lines, firstNumber)
+        self.first = 0
+        self.scannedEnd = firstNumber + len(lines)
+
+    def scan(self, lines, firstNumber: int):
+        if not self.pattern:
+            return []
+        if self.expression is None:
+            pattern = self.pattern
+            return [number for number, line in enumerate(lines, firstNumber) if pattern in line]
+        search = self.expression.search
+        return [number for number, line in enumerate(lines, firstNumber) if search(line)]
+
+    def filter(self, numbers: list, lines: list, firstNumber: int):
+        if self.expression is None:
+            pattern = self.pattern
+            return [number for number in numbers if pattern in lines[number - firstNumber]]
+        search = self.expression.search
+        return [number for number in numbers if search(lines[number - firstNumber])]
+
+    def addLines(self, lines: list, firstNumber: int):
+        # Indexes newly received lines, numbered from firstNumber. Lines already in the index are skipped.
+        skip = max(0, self.scannedEnd - firstNumber)
+        if skip >= len(lines):
+            return
+        self.matches.extend(self.scan(lines[skip:], firstNumber + skip))
+        self.scannedEnd = firstNumber + len(lines)
+
+    def dropBefore(self, number: int):
+        # Forgets matches of lines that are no longer stored
+        self.first = bisect_left(self.matches, number, self.first)
+        if self.first > 1024 and self.first > len(self.matches) // 2:
+            del self.matches[:self.first]
+            self.first = 0
+        self.scannedEnd = max(self.scannedEnd, number)
+
+    def next(self, number: int = None):
+        # First match after line number (the first match for None), wraps around. None: no matches
+        if len(self) == 0:
+            return None
+        position = self.first if number is None else bisect_right(self.matches, number, self.first)
+        if position >= len(self.matches):
+            position = self.first
+        return self.matches[position]
+
+    def previous(self, number: int = None):
+        # Last match before line number (the last match for None), wraps around. None: no matches
+        if len(self) == 0:
+            return None
+        position = len(self.matches) if number is None else bisect_left(self.matches, number, self.first)
+        if position <= self.first:
+            position = len(self.matches)
+        return self.matches[position - 1]
+
+    def position(self, number: int):
+        # 1-based position of the match at line number, 0 if the line does not match
+        position = bisect_left(self.matches, number, self.first)
+        if position < len(self.matches) and self.matches[position] == number:
+            return position - self.first + 1
+        return 0
+
+    def span(self, line: str):
+        # (start, end) of the first match in line
+        if self.expression is None:
+            start = line.find(self.pattern)
+            return (start, start + len(self.pattern)) if start >= 0 else (0, 0)
+        match = self.expression.search(line)
+        return match.span() if match else (0, 0)
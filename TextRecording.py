@@ -0,0 +1,261 @@
+import hashlib
+import os
+
+import numpy as np
+
+# Reader for the text recordings written by SerialThread.recordData:
+#   float.hex(time())                  start of a recording
+#   xxxx xxxx ... xxxx 4f4b|4650      one WU frame per line, hex words + CRC flag
+#   float.hex(time())                  end of a recording
+#   FatalError = n                     number of CRC errors
+# Lines of equal length that follow each other are stored as runs, so the index stays small and
+# frames can be decoded straight from the memory mapped file without parsing line by line.
+INDEX_VERSION = 2
+CHUNK_SIZE = 1 << 26
+
+HEX_TABLE = np.zeros(256, dtype=np.uint16)
+HEX_VALID = np.zeros(256, dtype=bool)
+for hexChar in b'0123456789abcdef':
+    HEX_TABLE[hexChar] = int(chr(hexChar), 16)
+    HEX_VALID[hexChar] = True
+for hexChar in b'ABCDEF':
+    HEX_TABLE[hexChar] = int(chr(hexChar), 16)
+    HEX_VALID[hexChar] = True
+
+CRC_OK_FLAG = 0x4f4b
+CRC_FLAGS = np.frombuffer(b'4f4b4650', dtype=np.uint8).reshape(2, 4)
+
+
+def indexCacheDirectory():
+    # Indexes are kept in the user's cache directory, nothing is written next to the recordings
+    base = os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME") or \
+        os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "TimSoft", "Serial Port Monitor", "recording_index")
+
+
+class TextRecording:
+    def __init__(self, filePath: str, useIndexCache: bool = True):
+        self.filePath = filePath
+        self.indexFilePath = os.path.join(indexCacheDirectory(), hashlib.sha1(
+            os.path.abspath(filePath).encode('utf-8')).hexdigest() + ".idx.npz")
+        self.data = np.memmap(filePath, dtype=np.uint8, mode='r') if os.path.getsize(filePath) > 0 \
+            else np.zeros(0, dtype=np.uint8)
+
+        self.runOffsets = []
+        self.runCounts = []
+        self.runStrides = []
+        self.runWords = []
+        self.timeOffsets = []
+        self.timeValues = []
+        self.footerOffsets = []
+        self.footerValues = []
+        self.noteOffsets = []
+        self.noteLengths = []
+
+        if not (useIndexCache and self.loadIndex()):
+            self.buildIndex()
+            if useIndexCache:
+                self.saveIndex()
+
+    # __________ Index __________
+    def sourceStat(self):
+        stat = os.stat(self.filePath)
+        return stat.st_size, stat.st_mtime_ns
+
+    def loadIndex(self):
+        if not os.path.exists(self.indexFilePath):
+            return False
+        try:
+            with np.load(self.indexFilePath) as index:
+                if int(index["version"]) != INDEX_VERSION or \
+                        (int(index["sourceSize"]), int(index["sourceMtime"])) != self.sourceStat():
+                    return False
+                for name in ("runOffsets", "runCounts", "runStrides", "runWords", "timeOffsets", "timeValues",
+                             "footerOffsets", "footerValues", "noteOffsets", "noteLengths"):
+                    setattr(self, name, index[name])
+            return True
+        except Exception as e:
+            print("Could not load recording index: " + str(e))
+            return False
+
+    def saveIndex(self):
+        sourceSize, sourceMtime = self.sourceStat()
+        # Written to a temporary file first, so a failed write never leaves a broken index behind
+        temporaryFilePath = self.indexFilePath + "." + str(os.getpid()) + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.indexFilePath), exist_ok=True)
+            with open(temporaryFilePath, 'wb') as file:
+                np.savez(file, version=INDEX_VERSION, sourceSize=sourceSize, sourceMtime=sourceMtime,
+                         runOffsets=self.runOffsets, runCounts=self.runCounts, runStrides=self.runStrides,
+                         runWords=self.runWords, timeOffsets=self.timeOffsets, timeValues=self.timeValues,
+                         footerOffsets=self.footerOffsets, footerValues=self.footerValues,
+                         noteOffsets=self.noteOffsets, noteLengths=self.noteLengths)
+            os.replace(temporaryFilePath, self.indexFilePath)
+        except Exception as e:
+            print("Could not save recording index: " + str(e))
+            try:
+                os.remove(temporaryFilePath)
+            except OSError:
+                pass
+
+    def buildIndex(self):
+        runs = []
+        times = []
+        footers = []
+        notes = []
+        lineStart = 0
+        size = len(self.data)
+        for chunkStart in range(0, size, CHUNK_SIZE):
+            newlines = np.flatnonzero(self.data[chunkStart:chunkStart + CHUNK_SIZE] == 10) + chunkStart
+            if len(newlines) == 0:
+                continue
+            starts = np.concatenate(([lineStart], newlines[:-1] + 1))
+            self.indexLines(starts, newlines, runs, times, footers, notes)
+            lineStart = int(newlines[-1]) + 1
+        if lineStart < size:
+            # Last line without newline, e.g. from a recording that was cut off
+            self.indexLines(np.asarray([lineStart]), np.asarray([size]), runs, times, footers, notes, False)
+
+        runs = np.asarray(runs, dtype=np.int64).reshape(-1, 4)
+        self.runOffsets, self.runCounts, self.runStrides, self.runWords = runs.T.copy()
+        self.timeOffsets = np.asarray([t[0] for t in times], dtype=np.int64)
+        self.timeValues = np.asarray([t[1] for t in times], dtype=np.float64)
+        self.footerOffsets = np.asarray([f[0] for f in footers], dtype=np.int64)
+        self.footerValues = np.asarray([f[1] for f in footers], dtype=np.int64)
+        self.noteOffsets = np.asarray([n[0] for n in notes], dtype=np.int64)
+        self.noteLengths = np.asarray([n[1] for n in notes], dtype=np.int64)
+
+    def indexLines(self, starts, ends, runs, times, footers, notes, terminated: bool = True):
+        # starts/ends: byte range of each line without the newline. terminated=False: the last line has no
+        # newline, its stride is its length, so it can't be merged with the runs before it
+        data = self.data
+        contentEnds = ends.copy()
+        hasContent = ends > starts
+        contentEnds[hasContent] -= (data[ends[hasContent] - 1] == 13).astype(np.int64)
+        lengths = contentEnds - starts
+        strides = ends - starts + 1
+        if not terminated:
+            strides[-1] -= 1
+
+        isFrame = np.zeros(len(starts), dtype=bool)
+        wordCounts = (lengths + 1) // 5
+        candidates = np.flatnonzero((lengths >= 4) & ((lengths + 1) % 5 == 0))
+        for length in np.unique(lengths[candidates]):
+            group = candidates[lengths[candidates] == length]
+            lines = data[starts[group, None] + np.arange(length)]
+            isSpace = np.zeros(length, dtype=bool)
+            isSpace[4::5] = True
+            valid = np.all(lines[:, isSpace] == 32, axis=1) & np.all(HEX_VALID[lines[:, ~isSpace]], axis=1)
+            # A line that was cut off at a word boundary has no CRC flag at its end
+            flags = lines[:, -4:]
+            valid &= np.all(flags == CRC_FLAGS[0], axis=1) | np.all(flags == CRC_FLAGS[1], axis=1)
+            isFrame[group[valid]] = True
+
+        frameLines = np.flatnonzero(isFrame)
+        if len(frameLines):
+            frameStarts = starts[frameLines]
+            frameStrides = strides[frameLines]
+            breaks = np.flatnonzero((frameStarts[1:] != frameStarts[:-1] + frameStrides[:-1]) |
+                                    (frameStrides[1:] != frameStrides[:-1])) + 1
+            runStarts = np.concatenate(([0], breaks))
+            runCounts = np.diff(np.concatenate((runStarts, [len(frameLines)])))
+            for runStart, runCount in zip(runStarts, runCounts):
+                offset = int(frameStarts[runStart])
+                stride = int(frameStrides[runStart])
+                words = int(wordCounts[frameLines[runStart]])
+                if runs and runs[-1][2] == stride and runs[-1][0] + runs[-1][1] * stride == offset:
+                    runs[-1][1] += int(runCount)
+                else:
+                    runs.append([offset, int(runCount), stride, words])
+
+        for line in np.flatnonzero(~isFrame):
+            text = data[starts[line]:contentEnds[line]].tobytes().decode('utf-8', 'replace').strip()
+            if text == "":
+                continue
+            if text.startswith("0x"):
+                try:
+                    times.append((int(starts[line]), float.fromhex(text)))
+                    continue
+                except ValueError:
+                    pass
+            if text.startswith("FatalError"):
+                try:
+                    footers.append((int(starts[line]), int(text.split("=")[1])))
+                    continue
+                except (IndexError, ValueError):
+                    pass
+            notes.append((int(starts[line]), int(lengths[line])))
+
+    # __________ Frames __________
+    def wordCounts(self):
+        # Number of hex words per line including the CRC flag, i.e. channels + 1
+        return sorted(int(words) for words in np.unique(self.runWords))
+
+    def frameCount(self, wordCount: int = None):
+        if wordCount is None:
+            return int(np.sum(self.runCounts))
+        return int(np.sum(self.runCounts[self.runWords == wordCount]))
+
+    def decodeRun(self, offset: int, count: int, stride: int, words: int):
+        lines = self.data[offset:offset + count * stride].reshape(count, stride)
+        hexDigits = HEX_TABLE[lines[:, :words * 5 - 1].reshape(count, -1)]
+        hexDigits = np.delete(hexDigits, np.s_[4::5], axis=1).reshape(count, words, 4)
+        values = (hexDigits[:, :, 0] << 12) | (hexDigits[:, :, 1] << 8) | (hexDigits[:, :, 2] << 4) | hexDigits[:, :, 3]
+        return values[:, :-1], values[:, -1] == CRC_OK_FLAG
+
+    def iterFrames(self, wordCount: int, chunkSize: int = 100000):
+        # Yields (values, crcOk) blocks of at most chunkSize frames, values being (frames, channels) uint16
+        for offset, count, stride, words in zip(self.runOffsets, self.runCounts, self.runStrides, self.runWords):
+            if words != wordCount:
+                continue
+            for first in range(0, int(count), chunkSize):
+                blockCount = min(chunkSize, int(count) - first)
+                yield self.decodeRun(int(offset) + first * int(stride), blockCount, int(stride), int(words))
+
+    def loadFrames(self, wordCount: int):
+        values = np.empty((self.frameCount(wordCount), wordCount - 1), dtype=np.uint16)
+        crcOk = np.empty(len(values), dtype=bool)
+        position = 0
+        for blockValues, blockCrcOk in self.iterFrames(wordCount):
+            values[position:position + len(blockValues)] = blockValues
+            crcOk[position:position + len(blockValues)] = blockCrcOk
+            position += len(blockValues)
+        return values, crcOk
+
+    def frameTimes(self, wordCount: int):
+        # Frames are only timed by the start/stop lines, so they are spread evenly in between
+        runFrameEnds = np.cumsum(self.runCounts)
+        runFrameStarts = runFrameEnds - self.runCounts
+        frameTotal = int(runFrameEnds[-1]) if len(runFrameEnds) else 0
+        interval = np.searchsorted(self.timeOffsets, self.runOffsets)
+        intervalCounts = np.bincount(np.repeat(interval, self.runCounts), minlength=len(self.timeOffsets) + 1)
+        intervalFirstFrame = np.concatenate(([0], np.cumsum(intervalCounts)[:-1]))
+
+        intervalStart = np.concatenate(([np.nan], self.timeValues))
+        intervalStop = np.concatenate((self.timeValues, [np.nan]))
+        times = np.empty(frameTotal, dtype=np.float64)
+        for run in range(len(self.runOffsets)):
+            if self.runWords[run] != wordCount:
+                continue
+            frames = np.arange(runFrameStarts[run], runFrameEnds[run])
+            runInterval = interval[run]
+            position = (frames - intervalFirstFrame[runInterval] + 0.5) / intervalCounts[runInterval]
+            times[runFrameStarts[run]:runFrameEnds[run]] = intervalStart[runInterval] + position * \
+                (intervalStop[runInterval] - intervalStart[runInterval])
+        return times[np.repeat(self.runWords == wordCount, self.runCounts)]
+
+    # __________ Metadata __________
+    def notes(self):
+        return [self.data[offset:offset + length].tobytes().decode('utf-8', 'replace').strip()
+                for offset, length in zip(self.noteOffsets, self.noteLengths)]
+
+    def segments(self):
+        # (start time, stop time, FatalError count) of every recording in the file
+        segments = []
+        for index in range(0, len(self.timeValues) - 1, 2):
+            fatalErrors = None
+            following = self.footerOffsets[self.footerOffsets > self.timeOffsets[index + 1]]
+            if len(following) and (index + 2 >= len(self.timeOffsets) or following[0] < self.timeOffsets[index + 2]):
+                fatalErrors = int(self.footerValues[np.flatnonzero(self.footerOffsets == following[0])[0]])
+            segments.append((float(self.timeValues[index]), float(self.timeValues[index + 1]), fatalErrors))
+        return segments
@@ -314,11 +314,9 @@ class VarCalculator(Tab):
             if not calibration:
                 return
 
-            self.receivedValueData = []
-            for numberIndex in range(0, len(data)):
-                self.receivedValueData.append(int(data[numberIndex], 16))
+            self.receivedValueData = data.values.tolist()
 
-            self.receivedCalValueData = calibration.calibrate(self.receivedValueData)
+            self.receivedCalValueData = calibration.calibrateFrame(obj.port, data)
 
             for calDataCounter in range(0, len(self.receivedCalValueData)):
                 tempName = calibration.port + '_CH' + str(calDataCounter) + "_" + calibration.getName(calDataCounter)
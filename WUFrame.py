@@ -0,0 +1,42 @@
+import numpy as np
+
+from CaptureClock import captureTime
+
+
+class WUFrame:
+    # One frame of a WU device: big endian uint16 words (payload + CRC word) as read from the port
+    CRC_OK_FLAG = '4f4b'
+    CRC_FAILED_FLAG = '4650'
+
+    def __init__(self, Kennbin: bytes, readLine: bytes, crcOk: bool, timestamp: float = None):
+        self.Kennbin = Kennbin
+        self.raw = readLine
+        self.values = np.frombuffer(readLine, '>u2')
+        self.crcOk = crcOk
+        if timestamp is None:
+            timestamp = captureTime()
+        self.timestamp = timestamp
+        # Set by CalibrationRegistry.calibrateFrame, fileKey of the calibration used for calValues
+        self.calValues = None
+        self.calibrationKey = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def __str__(self):
+        return self.recordLine()
+
+    def crcFlag(self):
+        if self.crcOk:
+            return self.CRC_OK_FLAG
+        return self.CRC_FAILED_FLAG
+
+    def wireBytes(self):
+        # The frame as sent by the device: sync word, Kennbin, payload and CRC
+        return b'\xaa\x55' + self.Kennbin + self.raw
+
+    def hexWords(self):
+        return self.raw.hex(' ', 2).split(' ')
+
+    def recordLine(self):
+        return self.raw.hex(' ', 2) + ' ' + self.crcFlag()
@@ -0,0 +1,76 @@
+import libscrc
+
+
+class WUFrameReader:
+    # Splits a raw WU byte stream into frames of the form
+    # AA 55 | Kennbin (2 bytes) | payload (2 * Kennung + 2 bytes) | CRC16 modbus (2 bytes)
+    SYNC = b'\xaa\x55'
+    HEADER_LENGTH = 4
+    CRC_LENGTH = 2
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.frameCounter = 0
+        self.crcErrorCounter = 0
+        self.discardedBytes = 0
+
+    def reset(self):
+        self.buffer.clear()
+
+    def frameLength(self, kennung: int):
+        return self.HEADER_LENGTH + 2 * kennung + 2 + self.CRC_LENGTH
+
+    def feed(self, chunk):
+        # Returns a list of (Kennbin, readLine, crcOk) tuples, readLine being payload + CRC like the
+        # bytes SerialThread used to read after the Kennbin. Incomplete frames stay in the buffer.
+        buffer = self.buffer
+        buffer += chunk
+        frames = []
+        bufferLength = len(buffer)
+        frameBytes = 0
+        pos = 0
+        view = memoryview(buffer)
+
+        while True:
+            start = buffer.find(self.SYNC, pos)
+            if start < 0:
+                # Keep a trailing 0xAA, it could be the first half of the next sync word
+                if bufferLength > pos and buffer[-1] == 0xaa:
+                    pos = bufferLength - 1
+                else:
+                    pos = bufferLength
+                break
+            if bufferLength - start < self.HEADER_LENGTH:
+                pos = start
+                break
+
+            frameEnd = start + self.frameLength(buffer[start + 2])
+            if frameEnd > bufferLength:
+                pos = start
+                break
+
+            Kennbin = view[start + 2:start + 4].tobytes()
+            readLine = view[start + 4:frameEnd].tobytes()
+            crcOk = libscrc.modbus(Kennbin + readLine[:-2]) == int.from_bytes(readLine[-2:], "big")
+
+            if not crcOk:
+                # A corrupt frame is only trusted if the next frame starts right behind it,
+                # otherwise the sync word was found inside payload data and we resync one byte later
+                if frameEnd + 2 > bufferLength:
+                    pos = start
+                    break
+                if buffer[frameEnd:frameEnd + 2] != self.SYNC:
+                    pos = start + 1
+                    continue
+                self.crcErrorCounter += 1
+
+            self.frameCounter += 1
+            frames.append((Kennbin, readLine, crcOk))
+            frameBytes += frameEnd - start
+            pos = frameEnd
+
+        view.release()
+        if pos > 0:
+            self.discardedBytes += pos - frameBytes
+            del buffer[:pos]
+        return frames
@@ -1,3 +1,4 @@
+import os
 import sys
 from PyQt5.QtWidgets import *
 from PyQt5.QtGui import *
@@ -6,6 +7,7 @@ from PortMenu import PortMenu
 from SerialParameters import SerialParameters
 from SerialConnectWindow import SerialConnectWindow
 from SerialWorker import SerialThread
+from ReplaySource import ReplayThread, replayParameters, isReplayPort, recordedCalibrationFile
 from UsefulFunctions import *
 from Terminal import Terminal
 from Graph import Graph
@@ -70,6 +72,7 @@ class MainWindow(QMainWindow):
         portMenu = PortMenu(self.connectedPorts, self)
         portMenu.connectActionTriggeredSignal.connect(self.openSerialConnectWindow)
         portMenu.disconnectActionTriggeredSignal.connect(self.killSerialConnection)
+        portMenu.replayActionTriggeredSignal.connect(self.openReplayDialog)
         self.menuBar().addMenu(portMenu)
         layoutMenu = LayoutMenu(self)
         layoutMenu.layout1x1Action.triggered.connect(lambda: self.changeLayout("1x1"))
@@ -136,27 +139,40 @@ class MainWindow(QMainWindow):
     def connectToSerial(self, window: SerialConnectWindow):
         serialParam = window.getSerialParameter()
         window.close()
-
-        serialThread = SerialThread(serialParam)
-        serialThread.signals.madeConnection.connect(lambda obj: self.madeSerialConnectionSignal.emit(obj))
-        serialThread.signals.lostConnection.connect(lambda obj: self.lostSerialConnectionSignal.emit(obj))
-        serialThread.signals.receivedData.connect(lambda obj, data: self.receiveSerialDataSignal.emit(obj, data))
-        serialThread.signals.failedSendData.connect(lambda obj, data: self.failedSendSerialDataSignal.emit(obj, data))
-
-        self.sendSerialWriteSignal.connect(serialThread.writeSerial)
-        self.killSerialConnectionSignal.connect(serialThread.kill)
-        self.pauseSerialConnectionSignal.connect(serialThread.pause)
-        self.resumeSerialConnectionSignal.connect(serialThread.resume)
-        self.startSerialRecordSignal.connect(serialThread.startRecordData)
-        self.stopSerialRecordSignal.connect(serialThread.stopRecordData)
-        self.pauseSerialRecordSignal.connect(serialThread.pauseRecordData)
-        self.resumeSerialRecordSignal.connect(serialThread.resumeRecordData)
-        self.writeToFileSignal.connect(serialThread.writeDataToFile)
-
-        QThreadPool.globalInstance().start(serialThread)
+        self.startSerialThread(SerialThread(serialParam))
 
     def reconnectToSerial(self, serialParam: SerialParameters):
-        serialThread = SerialThread(serialParam)
+        if isReplayPort(serialParam.port):
+            # Replays are not restarted with the application
+            return
+        self.startSerialThread(SerialThread(serialParam))
+
+    def openReplayDialog(self):
+        filePath, _ = QFileDialog.getOpenFileName(self, "Replay recording", "",
+                                                  "Recordings (*.rdq *.txt);;All files (*)")
+        if not filePath:
+            return
+        speeds = {"Real time": 1.0, "2x": 2.0, "5x": 5.0, "10x": 10.0, "100x": 100.0, "As fast as possible": 0.0}
+        speed, ok = QInputDialog.getItem(self, "Replay recording", "Replay speed:", list(speeds.keys()), 0, False)
+        if not ok:
+            return
+        maxSignalRate, ok = QInputDialog.getInt(self, "Replay recording", "Max signal rate (Hz):", 10, 1, 100000)
+        if not ok:
+            return
+        calibrationFilePath = ""
+        button = QMessageBox.question(self, "Replay recording", "Calibrate the replayed data?")
+        if button == QMessageBox.Yes:
+            # Suggests the calibration file the recording was made with
+            calibrationFilePath, _ = QFileDialog.getOpenFileName(None, "Open Calibration File",
+                                                                 recordedCalibrationFile(filePath) or os.getcwd(),
+                                                                 "csv(*.csv)\nall(*.*)", "",
+                                                                 QFileDialog.DontUseNativeDialog)
+        self.connectToReplay(filePath, speeds[speed], maxSignalRate, calibrationFilePath)
+
+    def connectToReplay(self, filePath: str, speed: float = 1.0, maxSignalRate: int = 10, calibrationFilePath: str = ""):
+        self.startSerialThread(ReplayThread(replayParameters(filePath, speed, maxSignalRate, calibrationFilePath)))
+
+    def startSerialThread(self, serialThread):
         serialThread.signals.madeConnection.connect(lambda obj: self.madeSerialConnectionSignal.emit(obj))
         serialThread.signals.lostConnection.connect(lambda obj: self.lostSerialConnectionSignal.emit(obj))
         serialThread.signals.receivedData.connect(lambda obj, data: self.receiveSerialDataSignal.emit(obj, data))
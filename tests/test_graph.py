@@ -0,0 +1,58 @@
+from SerialParameters import SerialParameters
+
+
+def test_restyled_lines_keep_shown_value_limit(qapp):
+    from Graph import Graph
+    parameters = SerialParameters("COM1", 115200)
+    parameters.readTextIndex = "read_lines"
+    graph = Graph("Graph: COM1", [parameters], "COM1")
+    graph.resize(800, 600)
+    graph.show()
+    qapp.processEvents()
+    graph.receiveData(parameters, b"A: 0 B: 0\n")
+    for line in graph.graphLines:
+        line.maxValueCount = 0
+    for i in range(1, 2000):
+        graph.receiveData(parameters, ("A: %d B: %d\n" % (i, -i)).encode())
+    graph.maxShownValues = 300
+    graph.plotGraph(True)
+    assert [len(line.dataLine.yData) for line in graph.graphLines] == [300, 300]
+
+    graph.graphLines[0].changed = True
+    graph.plotGraph()
+    assert [len(line.dataLine.yData) for line in graph.graphLines] == [300, 300]
+    graph.plotGraph(True)
+    assert [len(line.dataLine.yData) for line in graph.graphLines] == [300, 300]
+
+
+def test_wu_selection_cached_per_port_and_channel_count(qapp):
+    from Graph import Graph
+    graph = Graph("Graph: COM-ALL", [], "COM-ALL")
+    short = graph.checkWUForNewVars(3, "COM1")
+    long = graph.checkWUForNewVars(5, "COM1")
+    other = graph.checkWUForNewVars(3, "COM2")
+    assert graph.checkWUForNewVars(3, "COM1") is short
+    assert graph.checkWUForNewVars(5, "COM1") is long
+    assert graph.checkWUForNewVars(3, "COM2") is other
+    assert list(short.indices) == []
+
+    graph.table.cellWidget(1, 0).setChecked(True)
+    selection = graph.checkWUForNewVars(3, "COM1")
+    assert selection.names == ["COM1_CH1"]
+    assert list(selection.indices) == [1]
+    assert graph.checkWUForNewVars(5, "COM1").names == ["COM1_CH1"]
+
+
+def test_deleted_graph_is_unregistered_from_render_clock(qapp):
+    from PyQt5.QtCore import QCoreApplication, QEvent
+    from Graph import Graph
+    from RenderClock import RenderClock
+    graph = Graph("Graph: COM1", [], "COM1")
+    clock = RenderClock.instance()
+    clock.requestRedraw(graph)
+    assert graph in clock.subscriptions
+
+    graph.deleteLater()
+    QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+
+    assert graph not in clock.subscriptions
@@ -0,0 +1,59 @@
+import numpy as np
+
+from RdqRecording import RdqReader, RdqWriter
+from WUFrame import WUFrame
+
+
+def record(filePath, frames):
+    writer = RdqWriter(filePath)
+    for frame in frames:
+        writer.writeFrame(frame)
+    writer.close()
+    return writer
+
+
+def frame(Kennbin, values):
+    return WUFrame(Kennbin, np.asarray(values, dtype='>u2').tobytes(), True)
+
+
+def test_restarted_recording_does_not_overwrite(tmp_path):
+    filePath = str(tmp_path / "recording.rdq")
+    record(filePath, [frame(b'\x00\x01', [1, 2]), frame(b'\x00\x02', [3, 4, 5])])
+    second = record(filePath, [frame(b'\x00\x01', [6, 7]), frame(b'\x00\x02', [8, 9, 10])])
+
+    assert second.filePath == str(tmp_path / "recording_1.rdq")
+    assert RdqReader(filePath).values.tolist() == [[1, 2]]
+    assert RdqReader(str(tmp_path / "recording_0002.rdq")).values.tolist() == [[3, 4, 5]]
+    assert RdqReader(second.filePath).values.tolist() == [[6, 7]]
+    assert RdqReader(str(tmp_path / "recording_1_0002.rdq")).values.tolist() == [[8, 9, 10]]
+
+
+def test_replay_blocks(tmp_path, monkeypatch):
+    import ReplaySource
+    from ReplaySource import rdqBlocks
+    monkeypatch.setattr(ReplaySource, "BLOCK_SIZE", 4)
+    filePath = str(tmp_path / "recording.rdq")
+    frames = [WUFrame(b'\x00\x01', np.asarray([number, -number % 65536], dtype='>u2').tobytes(), number % 3 != 0)
+              for number in range(10)]
+    record(filePath, frames)
+
+    blocks = list(rdqBlocks(RdqReader(filePath)))
+
+    assert [len(values) for values, crcOk in blocks] == [4, 4, 2]
+    assert np.concatenate([values for values, crcOk in blocks]).tolist() == \
+        [[number, -number % 65536] for number in range(10)]
+    assert np.concatenate([crcOk for values, crcOk in blocks]).tolist() == [number % 3 != 0 for number in range(10)]
+
+
+def test_header_counts_written_frames(tmp_path):
+    filePath = str(tmp_path / "recording.rdq")
+    writer = RdqWriter(filePath)
+    assert writer.writeFrame(WUFrame(b'\x00\x01', b'\x00\x01\x00\x02', True))
+    # The record file stopped accepting data (e.g. after a write error), the frame must not be counted
+    writer.files[b'\x00\x01'].recordWriter.close()
+    assert not writer.writeFrame(WUFrame(b'\x00\x01', b'\x00\x03\x00\x04', False))
+    writer.close()
+
+    reader = RdqReader(filePath)
+    assert reader.header["frameCount"] == len(reader) == 1
+    assert reader.header["crcErrors"] == 0
@@ -0,0 +1,57 @@
+import os
+import time
+
+import pytest
+
+from RecordWriter import RecordWriter
+from TerminalLogger import TerminalLogger
+
+
+@pytest.mark.skipif(not os.path.exists("/dev/full"), reason="needs /dev/full")
+@pytest.mark.parametrize("binary", [False, True])
+def test_failed_write_stops_writer(binary):
+    writer = RecordWriter("/dev/full", binary=binary, flushSize=16, flushInterval=0.01)
+    data = b"x" * 64 if binary else "x" * 64
+    assert writer.write(data)
+    writer.thread.join(5)
+
+    assert not writer.thread.is_alive()
+    assert isinstance(writer.error, OSError)
+    assert not writer.write(data)
+    assert writer.pendingSize == 0
+    writer.close()
+    assert writer.file.closed
+
+
+@pytest.mark.skipif(not os.path.exists("/dev/full"), reason="needs /dev/full")
+def test_close_reports_buffered_write_errors():
+    writer = RecordWriter("/dev/full", flushInterval=60)
+    assert writer.write("line\n")
+    writer.close()
+
+    assert isinstance(writer.error, OSError)
+    assert writer.file.closed
+
+
+def test_writer_keeps_writing(tmp_path):
+    filePath = tmp_path / "record.txt"
+    writer = RecordWriter(str(filePath))
+    for number in range(100):
+        assert writer.write("line %d\n" % number)
+    writer.close()
+
+    assert writer.error is None
+    assert filePath.read_text().splitlines() == ["line %d" % number for number in range(100)]
+
+
+@pytest.mark.skipif(not os.path.exists("/dev/full"), reason="needs /dev/full")
+def test_terminal_logger_on_full_disk():
+    logger = TerminalLogger("/dev/full")
+    logger.writer.flushSize = 1
+    logger.write("line\n")
+    deadline = time.monotonic() + 5
+    while logger.writer.error is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert not logger.write("line\n")
+    logger.close()
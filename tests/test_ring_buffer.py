@@ -0,0 +1,29 @@
+from RingBuffer import RingBuffer
+
+
+def test_append_keeps_handed_out_views():
+    buffer = RingBuffer(10)
+    for value in range(15):
+        buffer.append(value)
+    view = buffer.view(0)
+    assert view.tolist() == list(range(5, 15))
+
+    for value in range(15, 40):
+        buffer.append(value)
+
+    assert view.tolist() == list(range(5, 15))
+    assert buffer.view(0).tolist() == list(range(30, 40))
+
+
+def test_extend_and_clear_keep_handed_out_views():
+    buffer = RingBuffer(10, columns=2)
+    buffer.extend(range(8), range(100, 108))
+    x, y = buffer.views()
+
+    buffer.extend(range(8, 20), range(108, 120))
+    buffer.clear()
+    buffer.append(-1, -2)
+
+    assert x.tolist() == list(range(8))
+    assert y.tolist() == list(range(100, 108))
+    assert buffer.view(1).tolist() == [-2]
@@ -0,0 +1,55 @@
+from SerialParameters import SerialParameters
+
+
+def makeTerminal():
+    from Terminal import Terminal
+    return Terminal("Terminal: ALL", [], "COM-ALL")
+
+
+def port():
+    return SerialParameters("COM1", 9600)
+
+
+def test_multi_line_chunks_are_stored_one_line_per_block(qapp):
+    terminal = makeTerminal()
+    terminal.maxLinesSpinBox.setValue(100)
+    for i in range(150):
+        terminal.receiveData(port(), ("line %d\nextra %d\r\n" % (i, i)).encode())
+    terminal.flushLines()
+
+    document = terminal.textEdit.document()
+    assert len(terminal.lines) == 100
+    assert document.blockCount() == len(terminal.lines)
+    assert [document.findBlockByNumber(number).text() for number in range(document.blockCount())] == \
+        list(terminal.lines)
+
+    terminal.searchLineEdit.setText("line 120")
+    terminal.updateSearch()
+    terminal.findNext()
+    cursor = terminal.textEdit.textCursor()
+    assert cursor.block().text() == "line 120"
+    assert cursor.selectedText() == "line 120"
+
+
+def test_line_breaks_match_the_document(qapp):
+    terminal = makeTerminal()
+    terminal.receiveData(port(), "a\rb\r\nc\n\rd e f".encode())
+    terminal.flushLines()
+
+    document = terminal.textEdit.document()
+    assert document.blockCount() == len(terminal.lines)
+    assert list(terminal.lines) == ["a", "b", "c", "", "d", "e f"]
+
+
+def test_deleted_terminal_closes_its_log(qapp, tmp_path, monkeypatch):
+    from PyQt5.QtCore import QCoreApplication, QEvent
+    monkeypatch.chdir(tmp_path)
+    terminal = makeTerminal()
+    terminal.loggingCheckbox.setChecked(True)
+    writer = terminal.logger.writer
+
+    terminal.deleteLater()
+    QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+
+    assert writer.file.closed
+    assert not writer.thread.is_alive()
@@ -0,0 +1,59 @@
+import numpy as np
+
+from TextRecording import TextRecording
+
+
+def frameLine(values, crcOk=True):
+    return " ".join("%04x" % value for value in values) + (" 4f4b" if crcOk else " 4650")
+
+
+def test_last_frame_without_newline(tmp_path):
+    filePath = tmp_path / "recording.txt"
+    lines = [float.hex(1000.0), frameLine([1, 2, 3, 4, 5, 6]), frameLine([7, 8, 9, 10, 11, 12], False)]
+    filePath.write_bytes("\n".join(lines).encode())
+
+    recording = TextRecording(str(filePath), useIndexCache=False)
+    values, crcOk = recording.loadFrames(7)
+
+    assert recording.frameCount(7) == 2
+    assert values.tolist() == [[1, 2, 3, 4, 5, 6], [7, 8, 9, 10, 11, 12]]
+    assert crcOk.tolist() == [True, False]
+
+
+def test_last_frame_without_newline_crlf(tmp_path):
+    filePath = tmp_path / "recording.txt"
+    lines = [frameLine([1, 2]), frameLine([3, 4]), frameLine([5, 6])]
+    filePath.write_bytes("\r\n".join(lines).encode())
+
+    values, crcOk = TextRecording(str(filePath), useIndexCache=False).loadFrames(3)
+
+    assert np.array_equal(values, [[1, 2], [3, 4], [5, 6]])
+    assert crcOk.all()
+
+
+def test_index_is_cached_outside_the_recording_directory(tmp_path, monkeypatch):
+    monkeypatch.delenv("LOCALAPPDATA", raising=False)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    recordingDirectory = tmp_path / "recordings"
+    recordingDirectory.mkdir()
+    filePath = recordingDirectory / "recording.txt"
+    filePath.write_bytes((frameLine([1, 2]) + "\n").encode())
+
+    recording = TextRecording(str(filePath))
+
+    assert [path.name for path in recordingDirectory.iterdir()] == ["recording.txt"]
+    assert recording.indexFilePath.startswith(str(tmp_path / "cache"))
+    cached = TextRecording(str(filePath))
+    assert cached.loadIndex()
+    assert cached.loadFrames(3)[0].tolist() == [[1, 2]]
+
+
+def test_index_write_errors_are_ignored(tmp_path, monkeypatch):
+    blocked = tmp_path / "blocked"
+    blocked.write_text("not a directory")
+    monkeypatch.delenv("LOCALAPPDATA", raising=False)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(blocked))
+    filePath = tmp_path / "recording.txt"
+    filePath.write_bytes((frameLine([1, 2]) + "\n").encode())
+
+    assert TextRecording(str(filePath)).loadFrames(3)[0].tolist() == [[1, 2]]
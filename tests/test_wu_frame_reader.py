@@ -0,0 +1,64 @@
+import libscrc
+import pytest
+
+from WUFrameReader import WUFrameReader
+
+
+def makeFrame(kennung: int, payload: bytes, crcOk: bool = True):
+    # AA 55 | Kennbin | payload (2 * kennung + 2 bytes) | CRC16 modbus
+    assert len(payload) == 2 * kennung + 2
+    Kennbin = bytes([kennung, 0x00])
+    crc = libscrc.modbus(Kennbin + payload)
+    if not crcOk:
+        crc ^= 0xffff
+    readLine = payload + crc.to_bytes(2, "big")
+    return b'\xaa\x55' + Kennbin + readLine, (Kennbin, readLine, crcOk)
+
+
+def feedInChunks(stream: bytes, chunkSize: int):
+    reader = WUFrameReader()
+    frames = []
+    for start in range(0, len(stream), chunkSize):
+        frames += reader.feed(stream[start:start + chunkSize])
+    return reader, frames
+
+
+@pytest.mark.parametrize("chunkSize", [1, 2, 3, 5, 7, 64])
+def test_bad_crc_followed_by_sync_word(chunkSize):
+    first, firstExpected = makeFrame(2, bytes(range(6)))
+    corrupt, corruptExpected = makeFrame(3, bytes(range(10, 18)), crcOk=False)
+    last, lastExpected = makeFrame(2, bytes(range(20, 26)))
+
+    reader, frames = feedInChunks(first + corrupt + last, chunkSize)
+
+    # The corrupt frame is trusted, because the next frame starts right behind it
+    assert frames == [firstExpected, corruptExpected, lastExpected]
+    assert reader.crcErrorCounter == 1
+    assert reader.discardedBytes == 0
+
+
+@pytest.mark.parametrize("chunkSize", [1, 2, 3, 5, 7, 64])
+def test_bad_crc_without_following_sync_word_is_skipped(chunkSize):
+    corrupt, corruptExpected = makeFrame(3, bytes(range(10, 18)), crcOk=False)
+    last, lastExpected = makeFrame(2, bytes(range(20, 26)))
+
+    reader, frames = feedInChunks(corrupt + b'\x01\x02\x03' + last, chunkSize)
+
+    assert frames == [lastExpected]
+    assert reader.crcErrorCounter == 0
+
+
+@pytest.mark.parametrize("chunkSize", [1, 2, 3, 5, 7, 64])
+def test_false_sync_word_inside_payload(chunkSize):
+    # The payload holds AA 55 01 00, which looks like the start of a frame with Kennung 1
+    cut, _ = makeFrame(4, b'\xaa\x55\x01\x00\x10\x11\x12\x13\x14\x15')
+    second, secondExpected = makeFrame(2, bytes(range(30, 36)))
+    third, thirdExpected = makeFrame(3, b'\xaa\x55' + bytes(range(40, 46)))
+
+    # The stream starts in the middle of the first frame, at the false sync word. The false frame would end
+    # two bytes before the next real frame, so it is dropped and the reader resyncs.
+    reader, frames = feedInChunks(cut[4:] + second + third, chunkSize)
+
+    assert frames == [secondExpected, thirdExpected]
+    assert reader.crcErrorCounter == 0
+    assert reader.discardedBytes == len(cut) - 4